@@ -1,11 +1,20 @@
-from flask_cors import CORS
 from flask_restful import Api
-from flask_sqlalchemy import SQLAlchemy
 from flask import Flask, jsonify
 from werkzeug.exceptions import HTTPException
+from api.cache import Cache
+from api.cors import cors
+from api.counts import Counts
+from api.database.pool import reset_pool
+from api.database.routing import RoutingSQLAlchemy, replicas
+from api.metrics import metrics
+from api.timing import timing
+from api.codec import codec, output_json, output_ndjson
+from api.serializers import UserSerializer
 from config import config
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
+cache = Cache()
+counts = Counts()
 
 
 class ExtendedAPI(Api):
@@ -14,6 +23,14 @@ class ExtendedAPI(Api):
     This class overrides 'handle_error' method of 'Api' class in Flask-RESTful,
     to extend global exception handing functionality
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # serialize responses with whichever JSON backend the app is using
+        self.representations = {
+            'application/json': output_json,
+            'application/x-ndjson': output_ndjson,
+        }
+
     def handle_error(self, err):  # pragma: no cover
         """
         prevents writing unnecessary try/except block throughout the app
@@ -42,31 +59,42 @@ class ExtendedAPI(Api):
 
 
 def create_app(config_name='default'):
+    """
+    never connects to the database, so gunicorn can call this once with
+    --preload and fork its workers from the result; each worker then calls
+    prepare_worker()
+    """
     # set up Flask here
     app = Flask(__name__)
 
     # use our 'config_name' to set up our config.py settings
     app.config.from_object(config[config_name])
 
-    # set up our database
+    # set up request metrics and query instrumentation; this comes before
+    # the database so the connection pool is built with checkout timing
+    metrics.init_app(app)
+
+    # set up our database, and the read replicas GET requests can use
     db.init_app(app)
+    replicas.init_app(app)
 
-    # set up CORS
-    CORS(app, resources={r"/*": {"origins": "*"}})
+    # set up our cache, and the row counts we keep in process
+    cache.init_app(app)
+    counts.init_app(app)
+
+    # set up our JSON encoder/decoder
+    codec.init_app(app)
+
+    # set up Server-Timing headers
+    timing.init_app(app)
+
+    # set up CORS; this wraps the whole app, so preflight requests are
+    # answered before Flask does any work at all
+    cors.init_app(app)
 
     # set up Flask-RESTful
     api = ExtendedAPI(app)
 
-    @app.after_request
-    def after_request(response):
-        """
-        CORS setup
-        """
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-        response.headers.add('Access-Control-Allow-Methods',
-                             'GET, PATCH, POST, DELETE, OPTIONS')
-        return response
-
     @app.errorhandler(404)
     def not_found(error):
         """
@@ -78,9 +106,34 @@ def create_app(config_name='default'):
             "message": "resource not found"
         }), 404
 
-    from api.resources.users import UsersResource, UserResource
-
-    api.add_resource(UserResource, '/api/v1/users/<user_id>')
+    from api.resources.health import HealthResource
+    from api.resources.metrics import MetricsResource
+    from api.resources.users import UsersResource, UserResource, \
+        UsersBatchResource, UsersCountResource, UserByUsernameResource, \
+        UserByEmailResource
+
+    api.add_resource(HealthResource, '/healthz')
+    api.add_resource(MetricsResource, '/metrics')
+
+    api.add_resource(UsersBatchResource, '/api/v1/users/batch')
+    api.add_resource(UsersCountResource, '/api/v1/users/count')
+    api.add_resource(UserResource, '/api/v1/users/<int:user_id>')
+    api.add_resource(UserByUsernameResource,
+                     '/api/v1/users/by-username/<username>')
+    api.add_resource(UserByEmailResource, '/api/v1/users/by-email/<email>')
     api.add_resource(UsersResource, '/api/v1/users')
 
+    # build our payload link templates from the routes we just registered
+    app.extensions['user_serializer'] = UserSerializer.from_url_map(
+        app.url_map, 'userresource', 'usersresource')
+
     return app
+
+
+def prepare_worker(app):
+    """
+    gives a forked worker a connection pool of its own, with
+    SQLALCHEMY_POOL_WARMUP connections opened ahead of the first requests
+    """
+    with app.app_context():
+        return reset_pool(db.engine, app.config['SQLALCHEMY_POOL_WARMUP'])
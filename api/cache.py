@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class LocalCache:
+    """
+    in-process cache with a TTL on every entry and least-recently-used
+    eviction once it holds more than 'max_entries' items; each gunicorn
+    worker gets its own copy
+    """
+    def __init__(self, ttl=60, max_entries=10000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class LocalRedis:
+    """
+    a stand-in for the handful of redis client calls SharedCache makes, so
+    the shared backend can be run (and tested) without a redis server
+    """
+    def __init__(self, max_entries=10000):
+        self._cache = LocalCache(max_entries=max_entries)
+
+    def get(self, name):
+        return self._cache.get(name)
+
+    def setex(self, name, time, value):
+        self._cache.set(name, value, ttl=time)
+
+    def delete(self, *names):
+        for name in names:
+            self._cache.delete(name)
+
+
+class SharedCache:
+    """
+    cache shared by every worker through redis; values are stored as JSON
+    so whatever goes in has to be JSON serializable
+    """
+    def __init__(self, client, ttl=60, prefix='api:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.setex(self.prefix + key,
+                          self.ttl if ttl is None else ttl,
+                          json.dumps(value))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class NullCache:
+    """
+    caching turned off; every lookup is a miss
+    """
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+def _redis_client(config):
+    """
+    the local stand-in is only for trying the shared backend out without a
+    redis server; with a URL set, falling back to it would quietly give each
+    worker a cache of its own that the others' writes never invalidate
+    """
+    url = config.get('CACHE_REDIS_URL')
+    if not url:
+        return LocalRedis(max_entries=config['CACHE_MAX_ENTRIES'])
+    try:
+        import redis
+    except ImportError:
+        raise ImportError(
+            "CACHE_REDIS_URL is set but redis isn't installed") from None
+    return redis.Redis.from_url(url)
+
+
+def make_backend(config):
+    backend = config['CACHE_BACKEND']
+    if backend == 'local':
+        return LocalCache(ttl=config['CACHE_TTL'],
+                          max_entries=config['CACHE_MAX_ENTRIES'])
+    if backend == 'shared':
+        return SharedCache(_redis_client(config), ttl=config['CACHE_TTL'])
+    if backend == 'null':
+        return NullCache()
+    raise ValueError(f'unknown CACHE_BACKEND {backend!r}')
+
+
+class Cache:
+    """
+    the current app's cache backend
+    """
+    def init_app(self, app):
+        app.extensions['cache'] = make_backend(app.config)
+
+    @property
+    def backend(self):
+        return current_app.extensions['cache']
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
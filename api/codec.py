@@ -0,0 +1,88 @@
+import json
+
+from flask import current_app, make_response
+
+from api.timing import phase
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class StdlibBackend:
+    name = 'stdlib'
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj).encode('utf-8')
+
+
+class OrjsonBackend:
+    name = 'orjson'
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+
+def make_backend(name):
+    """
+    'auto' picks orjson when it's installed and falls back to the standard
+    library; asking for 'orjson' by name when it isn't installed is an error
+    """
+    if name == 'auto':
+        name = 'stdlib' if orjson is None else 'orjson'
+    if name == 'stdlib':
+        return StdlibBackend()
+    if name == 'orjson':
+        if orjson is None:
+            raise ImportError(
+                "JSON_BACKEND is 'orjson' but orjson isn't installed")
+        return OrjsonBackend()
+    raise ValueError(f'unknown JSON_BACKEND {name!r}')
+
+
+class Codec:
+    """
+    the current app's JSON backend; dumps() always returns bytes, loads()
+    takes bytes or str
+    """
+    def init_app(self, app):
+        app.extensions['json_codec'] = make_backend(app.config['JSON_BACKEND'])
+
+    @property
+    def backend(self):
+        return current_app.extensions['json_codec']
+
+    def loads(self, data):
+        return self.backend.loads(data)
+
+    def dumps(self, obj):
+        return self.backend.dumps(obj)
+
+
+codec = Codec()
+
+
+def output_json(data, code, headers=None):
+    """
+    Flask-RESTful representation for application/json using our codec
+    """
+    with phase('serialization'):
+        body = codec.dumps(data) + b'\n'
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    return response
+
+
+def output_ndjson(data, code, headers=None):
+    """
+    Flask-RESTful representation for application/x-ndjson; a single
+    object is just one line of NDJSON
+    """
+    return output_json(data, code, headers)
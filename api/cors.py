@@ -0,0 +1,75 @@
+class _CORSMiddleware:
+    """
+    WSGI middleware that adds CORS headers to every response and answers
+    preflight requests itself, without going through Flask at all; every
+    header list it sends is built once, up front
+    """
+    def __init__(self, wsgi_app, origins, allow_headers, allow_methods,
+                 max_age):
+        self.wsgi_app = wsgi_app
+        self.any_origin = '*' in origins
+        common = [
+            ('Access-Control-Allow-Headers', allow_headers),
+            ('Access-Control-Allow-Methods', allow_methods),
+        ]
+        preflight = [
+            ('Access-Control-Max-Age', str(max_age)),
+            ('Content-Length', '0'),
+        ]
+
+        if self.any_origin:
+            self.headers = [('Access-Control-Allow-Origin', '*')] + common
+            self.preflight = self.headers + preflight
+            return
+
+        # the response depends on the Origin header, so caches need to know
+        self.headers = [('Vary', 'Origin')]
+        self.preflight = self.headers + [('Content-Length', '0')]
+        self.headers_by_origin = {
+            origin: [('Access-Control-Allow-Origin', origin),
+                     ('Vary', 'Origin')] + common
+            for origin in origins
+        }
+        self.preflight_by_origin = {
+            origin: headers + preflight
+            for origin, headers in self.headers_by_origin.items()
+        }
+
+    def __call__(self, environ, start_response):
+        origin = environ.get('HTTP_ORIGIN')
+        if environ['REQUEST_METHOD'] == 'OPTIONS' and origin is not None \
+                and 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' in environ:
+            # a preflight from a disallowed origin still gets an answer,
+            # just one without any Access-Control-Allow-* headers in it
+            headers = self.preflight if self.any_origin else \
+                self.preflight_by_origin.get(origin, self.preflight)
+            start_response('204 NO CONTENT', list(headers))
+            return []
+
+        headers = self.headers if self.any_origin else \
+            self.headers_by_origin.get(origin, self.headers)
+
+        def start_cors_response(status, response_headers, exc_info=None):
+            response_headers.extend(headers)
+            return start_response(status, response_headers, exc_info)
+
+        return self.wsgi_app(environ, start_cors_response)
+
+
+class Cors:
+    """
+    adds CORS headers for the CORS_ORIGINS allowed to call the API and
+    answers preflight requests without going through Flask
+    """
+    def init_app(self, app):
+        config = app.config
+        app.wsgi_app = _CORSMiddleware(
+            app.wsgi_app,
+            origins=config['CORS_ORIGINS'],
+            allow_headers=config['CORS_ALLOW_HEADERS'],
+            allow_methods=config['CORS_ALLOW_METHODS'],
+            max_age=config['CORS_MAX_AGE'],
+        )
+
+
+cors = Cors()
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from flask import current_app
+
+
+class LocalCount:
+    """
+    a row count kept in process, so we don't have to ask the database for
+    it on every request; writes adjust it as they commit, and once it's
+    'max_age' seconds old it's counted again, which also picks up whatever
+    other workers (or anything else) did to the table in the meantime
+    """
+    def __init__(self, max_age=60, clock=time.monotonic):
+        self.max_age = max_age
+        self._clock = clock
+        self._value = None
+        self._counted_at = None
+        self._lock = threading.Lock()
+
+    def get(self, count):
+        """
+        'count' is called to read the count from the database when we don't
+        have one yet or it's too old
+        """
+        with self._lock:
+            if self._value is not None \
+                    and self._clock() - self._counted_at < self.max_age:
+                return self._value
+        value = count()
+        with self._lock:
+            self._value = value
+            self._counted_at = self._clock()
+        return value
+
+    def add(self, delta):
+        with self._lock:
+            # nothing to adjust until we've counted once
+            if self._value is not None:
+                self._value = max(self._value + delta, 0)
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+
+
+class Counts:
+    """
+    the current app's row counts, by name, each recounted every
+    COUNT_RECONCILE_SECONDS
+    """
+    def init_app(self, app):
+        app.extensions['counts'] = {}
+
+    def _count(self, name):
+        counts = current_app.extensions['counts']
+        count = counts.get(name)
+        if count is None:
+            # setdefault() so two threads can't both start a new count
+            count = counts.setdefault(name, LocalCount(
+                max_age=current_app.config['COUNT_RECONCILE_SECONDS']))
+        return count
+
+    def get(self, name, count):
+        return self._count(name).get(count)
+
+    def add(self, name, delta):
+        self._count(name).add(delta)
+
+    def clear(self, name):
+        self._count(name).clear()
@@ -0,0 +1,165 @@
+import datetime
+import io
+
+from sqlalchemy import case, select
+
+from api import db
+from api.database.models import User
+
+# the most bind parameters SQLite takes in one statement (before 3.32 it's
+# 999 and can't be raised); Postgres takes 32767, so this does for both
+MAX_BIND_PARAMETERS = 999
+
+
+def chunked(values, parameters_each=1):
+    """
+    splits a list into chunks small enough that a statement binding
+    'parameters_each' parameters for every value in a chunk stays under
+    MAX_BIND_PARAMETERS
+    """
+    size = max(MAX_BIND_PARAMETERS // parameters_each, 1)
+    return [values[start:start + size]
+            for start in range(0, len(values), size)]
+
+
+def _supports_returning():
+    return db.session.get_bind().dialect.implicit_returning
+
+
+def insert_users(rows):
+    """
+    inserts a list of user column dicts with multi-row INSERT statements,
+    chunked by how many columns each row has so we stay under the bind
+    parameter limit; this doesn't commit, so the caller decides what the
+    transaction covers
+
+    returns the inserted (id, username, email) rows
+    """
+    table = User.__table__
+    columns = (table.c.id, table.c.username, table.c.email)
+    inserted = []
+    if not rows:
+        return inserted
+    # columns with a default we fill in are bound for every row too
+    parameters = set(rows[0]) | {
+        column.name for column in table.c if column.default is not None}
+    for chunk in chunked(rows, len(parameters)):
+        statement = table.insert().values(chunk)
+        if _supports_returning():
+            inserted.extend(
+                db.session.execute(statement.returning(*columns)).fetchall()
+            )
+        else:
+            db.session.execute(statement)
+            inserted.extend(db.session.execute(
+                select(list(columns)).where(
+                    table.c.username.in_([row['username'] for row in chunk])
+                )
+            ).fetchall())
+    return inserted
+
+
+def _copy_text(value):
+    # COPY's text format treats these characters specially
+    return value.replace('\\', '\\\\').replace('\t', '\\t') \
+        .replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_users(rows):
+    """
+    loads a list of user column dicts (username and email) as fast as the
+    database allows: COPY on Postgres, a single executemany INSERT anywhere
+    else. Unlike insert_users() it can't tell you the new ids, so it's for
+    seeding, not for the API. doesn't commit
+    """
+    if not rows:
+        return
+    if db.session.get_bind().dialect.name != 'postgresql':
+        db.session.execute(User.__table__.insert(), rows)
+        return
+
+    data = io.StringIO(''.join(
+        f'{_copy_text(row["username"])}\t{_copy_text(row["email"])}\n'
+        for row in rows
+    ))
+    # updated_at is left to its server default
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {User.__tablename__} (username, email) FROM STDIN', data)
+    finally:
+        cursor.close()
+
+
+# the columns update_users() can change
+UPDATE_FIELDS = ('username', 'email')
+
+
+def update_users(changes):
+    """
+    'changes' maps user ids to dicts of new column values; every user gets
+    their own values from an UPDATE ... SET column = CASE id ... END WHERE
+    id IN (...) statement, one per chunk of users. doesn't commit
+
+    returns the updated (id, username, email) rows
+    """
+    updated = []
+    # an id for the IN list, and an id and a value for each CASE
+    for chunk in chunked(list(changes.items()), 1 + 2 * len(UPDATE_FIELDS)):
+        updated.extend(_update_users(dict(chunk)))
+    return updated
+
+
+def _update_users(changes):
+    table = User.__table__
+    columns = (table.c.id, table.c.username, table.c.email)
+    ids = list(changes)
+    values = {}
+    for field in UPDATE_FIELDS:
+        whens = {
+            user_id: fields[field]
+            for user_id, fields in changes.items() if field in fields
+        }
+        if whens:
+            values[field] = case(whens, value=table.c.id,
+                                 else_=table.c[field])
+    # an empty change set still bumps updated_at, just like a single PATCH
+    values['updated_at'] = datetime.datetime.utcnow()
+
+    statement = table.update().where(table.c.id.in_(ids)).values(values)
+    if _supports_returning():
+        return db.session.execute(statement.returning(*columns)).fetchall()
+
+    db.session.execute(statement)
+    return db.session.execute(
+        select(list(columns)).where(table.c.id.in_(ids))
+    ).fetchall()
+
+
+def delete_users(ids):
+    """
+    deletes every user in 'ids' with a DELETE per chunk of ids; doesn't
+    commit
+
+    returns the ids that were actually deleted
+    """
+    deleted = []
+    for chunk in chunked(list(ids)):
+        deleted.extend(_delete_users(chunk))
+    return deleted
+
+
+def _delete_users(ids):
+    table = User.__table__
+    statement = table.delete().where(table.c.id.in_(ids))
+    if _supports_returning():
+        return [row.id for row in db.session.execute(
+            statement.returning(table.c.id)
+        )]
+
+    # without RETURNING, find out which ids exist with one set-based query
+    deleted = [row.id for row in db.session.execute(
+        select([table.c.id]).where(table.c.id.in_(ids))
+    )]
+    db.session.execute(statement)
+    return deleted
@@ -1,6 +1,11 @@
-import bleach
-from sqlalchemy import Column, String, Integer
-from api import db
+import datetime
+import sqlite3
+
+from sqlalchemy import Column, DateTime, DDL, Index, String, Integer, \
+    event, func, text
+from sqlalchemy.engine import Engine
+from api import cache, counts, db
+from api.sanitizer import sanitize
 
 
 class User(db.Model):
@@ -8,6 +13,17 @@ class User(db.Model):
     User Model
     """
     __tablename__ = 'users'
+    __table_args__ = (
+        # the unique index on username follows the database's collation, so
+        # Postgres can't use it for LIKE 'prefix%'; this one it can
+        Index('ix_users_username_pattern', 'username',
+              postgresql_ops={'username': 'text_pattern_ops'}),
+        # a trigram index is the only kind that helps LIKE '%@domain'
+        Index('ix_users_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}),
+        # keeps max(updated_at) cheap for the ETag on streamed responses
+        Index('ix_users_updated_at', 'updated_at'),
+    )
 
     # Auto-incrementing, unique primary key
     id = Column(Integer, primary_key=True)
@@ -15,15 +31,29 @@ class User(db.Model):
     username = Column(String(80), unique=True, nullable=False)
     # unique email
     email = Column(String(100), unique=True, nullable=False)
+    # bumped on every change, used for ETag and Last-Modified headers; the
+    # server default is in UTC like utcnow(), whatever timezone the database
+    # session is in (the parentheses are for SQLite, which has no timezone()
+    # but only needs to parse it, since SQLAlchemy fills this in there)
+    updated_at = Column(DateTime, nullable=False,
+                        default=datetime.datetime.utcnow,
+                        onupdate=datetime.datetime.utcnow,
+                        server_default=text("(timezone('utc', now()))"))
 
-    def __init__(self, username, email, user_id=None):
+    def __init__(self, username, email, user_id=None, sanitized=False):
+        """
+        pass sanitized=True when the values have already been through
+        api.sanitizer.sanitize(), so we don't clean them twice
+        """
         if username is not None:
-            username = bleach.clean(username).strip()
+            if not sanitized:
+                username = sanitize(username)
             if username == '':
                 username = None
 
         if email is not None:
-            email = bleach.clean(email).strip()
+            if not sanitized:
+                email = sanitize(email)
             if email == '':
                 email = None
 
@@ -32,6 +62,33 @@ class User(db.Model):
         if user_id is not None:
             self.id = user_id
 
+    @staticmethod
+    def cache_key(user_id):
+        return f'user:{user_id}'
+
+    @staticmethod
+    def alias_key(field, value):
+        """
+        cache key mapping a unique field's value to a user id
+        """
+        return f'user:{field}:{value}'
+
+    @classmethod
+    def count(cls, estimate=False):
+        """
+        how many users there are; with estimate=True, Postgres answers with
+        the planner's estimate from the last ANALYZE instead of counting
+        every row, falling back to COUNT(*) if the table was never analyzed
+        """
+        if estimate and db.session.get_bind().dialect.name == 'postgresql':
+            rows = db.session.execute(text(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = CAST(:table AS regclass)'
+            ), {'table': cls.__tablename__}).scalar()
+            if rows is not None and rows > 0:
+                return rows
+        return db.session.query(func.count(cls.id)).scalar()
+
     def insert(self):
         """
         inserts a new model into a database
@@ -40,6 +97,7 @@ class User(db.Model):
         """
         db.session.add(self)
         db.session.commit()
+        counts.add(self.__tablename__, 1)
 
     def update(self):
         """
@@ -47,6 +105,7 @@ class User(db.Model):
         the model must exist in the database
         """
         db.session.commit()
+        cache.delete(self.cache_key(self.id))
 
     def delete(self):
         """
@@ -55,3 +114,23 @@ class User(db.Model):
         """
         db.session.delete(self)
         db.session.commit()
+        cache.delete(self.cache_key(self.id))
+        counts.add(self.__tablename__, -1)
+
+
+# gin_trgm_ops comes from the pg_trgm extension
+event.listen(
+    User.__table__, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+        dialect='postgresql')
+)
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_case_sensitive_like(dbapi_connection, connection_record):
+    """
+    makes SQLite's LIKE case sensitive like Postgres's, which also lets it
+    use the username index for prefix searches
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA case_sensitive_like = ON')
@@ -0,0 +1,63 @@
+import time
+
+from sqlalchemy.pool import QueuePool
+
+from api.metrics import POOL_CHECKOUT_SECONDS
+
+
+class TimedQueuePool(QueuePool):
+    """
+    a QueuePool that records how long each checkout waited for a connection;
+    if this climbs, there are more threads or greenlets per worker than
+    pooled connections
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+
+def pool_status(engine):
+    """
+    what the engine's connection pool is up to; queue pools report their
+    size and usage, other pools (SQLite's, for instance) just their class
+    """
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    for stat in ('size', 'checkedin', 'checkedout', 'overflow', 'timeout'):
+        method = getattr(pool, stat, None)
+        if callable(method):
+            status[stat] = method()
+    return status
+
+
+def warm_up_pool(engine, connections):
+    """
+    opens up to 'connections' connections at once and hands them straight
+    back to the pool, so they're ready for the first requests
+    """
+    size = getattr(engine.pool, 'size', None)
+    if callable(size):
+        connections = min(connections, size())
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+def reset_pool(engine, connections=0):
+    """
+    for a freshly forked worker: drops any pooled connections it may have
+    inherited from the process it was forked from (they can't be shared),
+    then warms up 'connections' new ones of its own
+    """
+    engine.dispose()
+    if connections:
+        return warm_up_pool(engine, connections)
+    return 0
@@ -0,0 +1,101 @@
+import functools
+import itertools
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import orm
+
+# where a request that reads from a replica keeps the one it was given
+REPLICA_ENVIRON_KEY = 'api.database.replica'
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def current_replica():
+    """
+    the bind name of the replica this request reads from, or None if it
+    reads from the primary
+    """
+    if not has_request_context():
+        return None
+    return request.environ.get(REPLICA_ENVIRON_KEY)
+
+
+class RoutingSession(SignallingSession):
+    """
+    a session that reads from the request's replica, if it was given one
+    (see replica_reads()), and does everything else on the primary: every
+    flush goes there, and so does any model with a __bind_key__ of its own
+    """
+    def __init__(self, db, **options):
+        self._db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = current_replica()
+        if replica is not None and not self._flushing \
+                and not _has_bind_key(mapper):
+            return self._db.get_engine(self.app, bind=replica)
+        return super().get_bind(mapper, clause)
+
+
+def _has_bind_key(mapper):
+    if mapper is None:
+        return False
+    return mapper.persist_selectable.info.get('bind_key') is not None
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    Flask-SQLAlchemy with a RoutingSession instead of its own session
+    """
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class Replicas:
+    """
+    hands out the DATABASE_REPLICAS in turn, except to clients that wrote
+    something in the last DATABASE_REPLICA_LAG seconds, which read from the
+    primary so they don't miss their own change
+    """
+    def init_app(self, app):
+        app.extensions['replicas'] = itertools.cycle(
+            app.config['DATABASE_REPLICAS'] or [None])
+        if app.config['DATABASE_REPLICAS']:
+            app.after_request(_stick_to_primary)
+
+    def wrote_recently(self):
+        return current_app.config['DATABASE_PRIMARY_COOKIE'] in \
+            request.cookies
+
+    def choose(self):
+        """
+        the replica the current request should read from, or None for the
+        primary
+        """
+        if self.wrote_recently():
+            return None
+        return next(current_app.extensions['replicas'])
+
+
+def _stick_to_primary(response):
+    if request.method not in READ_METHODS and response.status_code < 400:
+        config = current_app.config
+        response.set_cookie(
+            config['DATABASE_PRIMARY_COOKIE'], '1',
+            max_age=config['DATABASE_REPLICA_LAG'], httponly=True)
+    return response
+
+
+replicas = Replicas()
+
+
+def replica_reads(method):
+    """
+    decorates a Resource's get() so its queries can go to a read replica
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        request.environ[REPLICA_ENVIRON_KEY] = replicas.choose()
+        return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,176 @@
+import os
+import random
+import time
+
+from flask import current_app, g, has_request_context, request
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, \
+    REGISTRY, generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from api.timing import record, resource_name
+
+DB_QUERIES = Counter(
+    'api_db_queries_total',
+    'Database queries run while handling sampled requests',
+    ['endpoint'],
+)
+DB_QUERY_SECONDS = Histogram(
+    'api_db_query_duration_seconds',
+    'Database query latency for sampled requests',
+    ['endpoint'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+)
+
+REQUESTS = Counter(
+    'api_requests_total',
+    'Requests handled, by resource, HTTP method and status code',
+    ['resource', 'method', 'status'],
+)
+REQUEST_SECONDS = Histogram(
+    'api_request_duration_seconds',
+    'Time from a request arriving to its response being ready',
+    ['resource', 'method'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'api_requests_in_flight',
+    'Requests being handled right now',
+    # with several gunicorn workers, add up the workers that are still alive
+    multiprocess_mode='livesum',
+)
+RESPONSE_BYTES = Histogram(
+    'api_response_size_bytes',
+    'Size of response bodies (streamed responses are left out)',
+    ['resource', 'method'],
+    buckets=(100, 1000, 10000, 100000, 1000000, 10000000),
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    'api_db_pool_checkout_seconds',
+    'Time spent waiting for a connection from the database pool',
+    buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 10, 30),
+)
+
+
+def multiprocess_dir():
+    """
+    prometheus_client keeps metrics in files under this directory when it's
+    set, so every gunicorn worker's numbers can be added up at /metrics
+    """
+    return os.environ.get('prometheus_multiproc_dir')
+
+
+def latest():
+    """
+    the text /metrics serves: this process's metrics, or every worker's
+    when running in multiprocess mode
+    """
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid):
+    """
+    call from gunicorn's child_exit hook so a dead worker's in-flight count
+    stops being reported
+    """
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
+
+
+def _start_request():
+    g.metrics_start = request.environ.get(
+        'api.request_start', time.perf_counter())
+    REQUESTS_IN_FLIGHT.inc()
+    g.in_flight = True
+
+
+def _finish_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    resource = resource_name()
+    method = request.method
+    REQUESTS.labels(resource, method, response.status_code).inc()
+    REQUEST_SECONDS.labels(resource, method).observe(
+        time.perf_counter() - start)
+    size = response.calculate_content_length()
+    if size is not None:
+        RESPONSE_BYTES.labels(resource, method).observe(size)
+    return response
+
+
+def _end_request(exc):
+    if g.pop('in_flight', False):
+        REQUESTS_IN_FLIGHT.dec()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    # the start goes on the statement's own execution context rather than
+    # the connection, so a statement that fails doesn't leave it behind
+    if context is not None and has_request_context() \
+            and (g.get('sample_queries') or 'timings' in g):
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = getattr(context, '_query_start', None)
+    if start is None or not has_request_context():
+        return
+    elapsed = time.perf_counter() - start
+    # database time for this request's Server-Timing header
+    record('db', elapsed)
+    if g.get('sample_queries'):
+        endpoint = request.endpoint or 'none'
+        DB_QUERIES.labels(endpoint).inc()
+        DB_QUERY_SECONDS.labels(endpoint).observe(elapsed)
+
+
+class Metrics:
+    """
+    Prometheus metrics for every request, and for the queries of a
+    QUERY_SAMPLE_RATE share of them; init_app() has to run before anything
+    touches db.engine so pool checkouts get timed too
+    """
+    def init_app(self, app):
+        config = app.config
+        if config['REQUEST_METRICS']:
+            app.before_request(_start_request)
+            app.after_request(_finish_request)
+            app.teardown_request(_end_request)
+            self._time_pool_checkouts(config)
+
+        if not config['QUERY_INSTRUMENTATION'] and not config['SERVER_TIMING']:
+            return
+
+        if not event.contains(Engine, 'before_cursor_execute',
+                              _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute',
+                         _after_cursor_execute)
+
+        if not config['QUERY_INSTRUMENTATION']:
+            return
+
+        @app.before_request
+        def sample_queries():
+            g.sample_queries = \
+                random.random() < current_app.config['QUERY_SAMPLE_RATE']
+
+    @staticmethod
+    def _time_pool_checkouts(config):
+        # only queue pools ever make a request wait; SQLite doesn't get one
+        options = config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        if 'pool_size' in options and 'poolclass' not in options:
+            from api.database.pool import TimedQueuePool
+            config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+                options, poolclass=TimedQueuePool)
+
+
+metrics = Metrics()
@@ -0,0 +1,27 @@
+from flask_restful import Resource
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from api import db
+from api.database.pool import pool_status
+
+
+class HealthResource(Resource):
+    """
+    this Resource file is for our load balancer and uptime checks
+    GET /healthz
+    """
+    def get(self, *args, **kwargs):
+        try:
+            db.session.execute(text('SELECT 1'))
+            database = 'ok'
+        except SQLAlchemyError:
+            db.session.rollback()
+            database = 'unavailable'
+
+        healthy = database == 'ok'
+        return {
+            'success': healthy,
+            'database': database,
+            'pool': pool_status(db.engine),
+        }, 200 if healthy else 503
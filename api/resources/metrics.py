@@ -0,0 +1,17 @@
+from flask import Response
+from flask_restful import Resource
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from api.metrics import latest
+
+
+class MetricsResource(Resource):
+    """
+    this Resource file is for Prometheus to scrape
+    GET /metrics
+
+    under gunicorn with prometheus_multiproc_dir set, this adds up the
+    metrics of every worker rather than whichever one answered the scrape
+    """
+    def get(self, *args, **kwargs):
+        return Response(latest(), mimetype=CONTENT_TYPE_LATEST)
@@ -1,43 +1,426 @@
+import base64
+import binascii
 import datetime
+import hashlib
 import json
+from urllib.parse import urlencode
 
-import bleach
-from flask import request
+from flask import Response, current_app, request, stream_with_context
 from flask_restful import Resource, abort
-from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import http_date, quote_etag
 
-from api import db
+from api import cache, counts, db
+from api.codec import codec
+from api.database.bulk import chunked, delete_users, insert_users, \
+    update_users
 from api.database.models import User
+from api.database.routing import current_replica, replica_reads, replicas
+from api.sanitizer import sanitize
+from api.schemas import user_schema
+from api.timing import timed
 
 
-def _validate_field(data, field, proceed, errors, missing_okay=False):
-    if field in data:
-        # sanitize the user input here
-        data[field] = bleach.clean(data[field].strip())
-        if len(data[field]) == 0:
-            proceed = False
-            errors.append(f"required '{field}' parameter is blank")
-    if not missing_okay and field not in data:
-        proceed = False
-        errors.append(f"required '{field}' parameter is missing")
-        data[field] = ''
+@timed('validation')
+def _load_json(max_bytes):
+    """
+    parses the request body, refusing anything bigger than 'max_bytes'
+    before we spend any time on it; returns (data, error response)
+    """
+    if request.content_length is not None \
+            and request.content_length > max_bytes:
+        return None, _body_too_large()
+    body = request.get_data()
+    if len(body) > max_bytes:
+        return None, _body_too_large()
+    if not body:
+        return {}, None
+    try:
+        return codec.loads(body), None
+    except ValueError:
+        return None, ({
+            'success': False,
+            'error': 400,
+            'errors': ['request body must be valid JSON']
+        }, 400)
+
+
+def _body_too_large():
+    return {
+        'success': False,
+        'error': 413,
+        'errors': ['request body is too large']
+    }, 413
+
 
-    return proceed, data[field], errors
+def _serializer():
+    return current_app.extensions['user_serializer']
 
 
 def _user_payload(user):
+    return _serializer().serialize(user)
+
+
+def _view_params(args):
+    """
+    reads the ?fields= sparse fieldset and the ?links= switch from the query
+    string
+    """
+    errors = []
+    fields = None
+    if 'fields' in args:
+        fields = tuple(
+            field.strip() for field in args['fields'].split(',')
+            if field.strip()
+        )
+        allowed = _serializer().FIELDS
+        if not fields or any(field not in allowed for field in fields):
+            errors.append("'fields' parameter can only include "
+                          + ', '.join(allowed))
+    links = args.get('links', 'true').lower() not in ('false', '0', 'no')
+    return fields, links, errors
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%') \
+        .replace('_', '\\_')
+
+
+# search filters for GET /api/v1/users; each one is backed by an index
+_FILTERS = {
+    'username': lambda value: User.username == value,
+    'email': lambda value: User.email == value,
+    'username_prefix': lambda value: User.username.like(
+        _like_escape(value) + '%', escape='\\'),
+    'email_domain': lambda value: User.email.ilike(
+        '%@' + _like_escape(value.lstrip('@')), escape='\\'),
+}
+
+
+def _filter_params(args):
+    """
+    reads the search filters from the query string and returns them as
+    criteria for a User query; values get the same sanitizing as the data
+    we store, so they match what was saved
+    """
+    errors = []
+    criteria = []
+    for name, criterion in _FILTERS.items():
+        if name not in args:
+            continue
+        value = sanitize(args[name])
+        if not value.lstrip('@'):
+            errors.append(f"'{name}' parameter must not be blank")
+            continue
+        criteria.append(criterion(value))
+    return criteria, errors
+
+
+def _encode_cursor(user, direction):
+    """
+    cursors are opaque to the client; they just carry the (username, id)
+    keyset position of a row and which way to page from there
+    """
+    raw = json.dumps({'u': user.username, 'i': user.id, 'd': direction})
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('d') not in ('next', 'prev') \
+            or not isinstance(data.get('u'), str) \
+            or not isinstance(data.get('i'), int):
+        return None
+    return data
+
+
+def _page_params(args):
+    """
+    reads ?limit= and ?cursor= from the query string; limit is clamped to
+    the USERS_MAX_PAGE_SIZE hard cap
+    """
+    errors = []
+    limit = current_app.config['USERS_PAGE_SIZE']
+    if 'limit' in args:
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            errors.append("'limit' parameter must be a positive integer")
+    limit = min(limit, current_app.config['USERS_MAX_PAGE_SIZE'])
+
+    cursor = None
+    if args.get('cursor'):
+        cursor = _decode_cursor(args['cursor'])
+        if cursor is None:
+            errors.append("'cursor' parameter is invalid")
+
+    return limit, cursor, errors
+
+
+def _keyset_page(query, limit, cursor):
+    """
+    fetches one page of users ordered by (username, id), asking for one
+    extra row to find out whether there's another page in that direction
+    """
+    ascending = (User.username.asc(), User.id.asc())
+    if cursor is None:
+        rows = query.order_by(*ascending).limit(limit + 1).all()
+        return rows[:limit], False, len(rows) > limit
+
+    if cursor['d'] == 'next':
+        rows = query.filter(or_(
+            User.username > cursor['u'],
+            and_(User.username == cursor['u'], User.id > cursor['i'])
+        )).order_by(*ascending).limit(limit + 1).all()
+        return rows[:limit], True, len(rows) > limit
+
+    rows = query.filter(or_(
+        User.username < cursor['u'],
+        and_(User.username == cursor['u'], User.id < cursor['i'])
+    )).order_by(
+        User.username.desc(), User.id.desc()
+    ).limit(limit + 1).all()
+    return list(reversed(rows[:limit])), len(rows) > limit, True
+
+
+def _page_link(cursor, limit):
+    args = request.args.to_dict()
+    args.update({'cursor': cursor, 'limit': limit})
+    return f'/api/v1/users?{urlencode(args)}'
+
+
+def _stream_format():
+    """
+    '?stream=ndjson' or 'Accept: application/x-ndjson' gets one JSON user
+    per line, '?stream=1' gets the usual envelope written out in chunks;
+    anything else gets a normal paginated response
+    """
+    stream = request.args.get('stream', '').lower()
+    if stream == 'ndjson' or request.accept_mimetypes.best_match(
+            ['application/json', 'application/x-ndjson']
+    ) == 'application/x-ndjson':
+        return 'ndjson'
+    if stream in ('1', 'true', 'json'):
+        return 'json'
+    return None
+
+
+def _stream_users(stream_format, fields=None, links=True, criteria=()):
+    """
+    streams every user (matching 'criteria', if there are any) without
+    building the whole list in memory; rows
+    come off a server-side cursor in batches and each batch is written out
+    as a single chunk
+    """
+    batch_size = current_app.config['USERS_STREAM_BATCH_SIZE']
+    serialize = _serializer().serialize
+    users = User.query.filter(*criteria).order_by(
+        User.username.asc(), User.id.asc()
+    ).execution_options(stream_results=True).yield_per(batch_size)
+
+    def chunks():
+        chunk = []
+        for user in users:
+            chunk.append(codec.dumps(serialize(user, fields, links)))
+            if len(chunk) == batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def generate_ndjson():
+        for chunk in chunks():
+            yield b'\n'.join(chunk) + b'\n'
+
+    def generate_json():
+        yield b'{"success": true, "results": ['
+        separator = b''
+        for chunk in chunks():
+            yield separator + b', '.join(chunk)
+            separator = b', '
+        yield b']}'
+
+    if stream_format == 'ndjson':
+        return Response(stream_with_context(generate_ndjson()),
+                        mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_json()),
+                    mimetype='application/json')
+
+
+def _timestamp(value):
+    # our DateTime columns hold naive UTC values
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _etag(*parts):
+    return hashlib.sha1(
+        '|'.join(str(part) for part in parts).encode('utf-8')
+    ).hexdigest()
+
+
+def _user_entry(user):
+    """
+    what we keep in the cache for one user: the payload plus the validators
+    needed to answer a conditional GET without touching the database
+    """
     return {
-        'id': user.id,
-        'username': user.username,
-        'email': user.email,
-        'links': {
-            'get': f'/api/v1/users/{user.id}',
-            'patch': f'/api/v1/users/{user.id}',
-            'delete': f'/api/v1/users/{user.id}',
-            'index': '/api/v1/users',
-        }
+        'payload': _user_payload(user),
+        'etag': _etag(user.id, user.updated_at.isoformat()),
+        'last_modified': _timestamp(user.updated_at),
     }
 
+
+def _cache_get(key):
+    # a client that just wrote something reads from the primary; the cache
+    # may still hold what a replica told someone else a moment ago
+    if replicas.wrote_recently():
+        return None
+    return cache.get(key)
+
+
+def _cache_set(key, value):
+    # what a replica says may be a little behind, so keep it only as long
+    # as we expect a replica to be
+    ttl = None
+    if current_replica() is not None:
+        ttl = current_app.config['DATABASE_REPLICA_LAG']
+    cache.set(key, value, ttl)
+
+
+def _cached_entry(user_id):
+    """
+    one user's cache entry, loaded from the database (and cached) on a
+    miss; None if there's no such user
+    """
+    cache_key = User.cache_key(user_id)
+    entry = _cache_get(cache_key)
+    if entry is None:
+        user = db.session.query(User).filter_by(id=user_id).one_or_none()
+        if user is None:
+            return None
+        entry = _user_entry(user)
+        _cache_set(cache_key, entry)
+    return entry
+
+
+def _lookup_entry(field, value):
+    """
+    like _cached_entry(), for a user found by a unique field instead of by
+    id; the cache maps the field's value to an id, and that mapping is only
+    trusted if the user it leads to still has that value, so renames don't
+    need to clean it up
+    """
+    alias_key = User.alias_key(field, value)
+    user_id = _cache_get(alias_key)
+    if user_id is not None:
+        entry = _cached_entry(user_id)
+        if entry is not None and entry['payload'][field] == value:
+            return entry
+
+    user = db.session.query(User).filter(
+        getattr(User, field) == value
+    ).one_or_none()
+    if user is None:
+        return None
+    entry = _user_entry(user)
+    _cache_set(User.cache_key(user.id), entry)
+    _cache_set(alias_key, user.id)
+    return entry
+
+
+def _entry_response(entry, fields, links):
+    etag = entry['etag']
+    if fields is not None or not links:
+        # a sparse fieldset is a different representation of the user
+        etag = _etag(etag, fields, links)
+    headers = _validator_headers(etag, entry['last_modified'])
+    if _not_modified(etag, entry['last_modified']):
+        return Response(status=304, headers=headers)
+
+    user_payload = _serializer().select(entry['payload'], fields, links)
+    user_payload['success'] = True
+    return user_payload, 200, headers
+
+
+def _validator_headers(etag, last_modified):
+    headers = {'ETag': quote_etag(etag)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def _not_modified(etag, last_modified):
+    """
+    If-None-Match wins over If-Modified-Since when a client sends both
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    if since is not None and last_modified is not None:
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return int(last_modified) <= since.timestamp()
+    return False
+
+
+def _stream_validators(criteria=()):
+    """
+    a stream's ETag comes from max(updated_at) and count(*) of the matching
+    rows rather than the rows themselves, plus the query string since that
+    decides the stream format; updated_at is indexed, so max() is cheap
+
+    there's no Last-Modified to go with it: deleting a row changes the
+    stream without raising max(updated_at), so If-Modified-Since would
+    keep getting 304s; returns the count as well, since we've paid for it
+    """
+    latest, count = db.session.query(
+        func.max(User.updated_at), func.count(User.id)
+    ).filter(*criteria).one()
+    return _etag(latest, count, request.full_path, _stream_format()), count
+
+
+def _page_validators(users, has_prev, has_next):
+    """
+    a page's ETag comes from the (id, updated_at) of the rows we fetched
+    for it anyway, whether there are pages either side of it, and the query
+    string; so it costs nothing per row beyond the page itself, and doesn't
+    slow down as the table grows (no Last-Modified, for the same reason as
+    streams)
+    """
+    return _etag([(user.id, user.updated_at.isoformat()) for user in users],
+                 has_prev, has_next, request.full_path)
+
+
+def _user_count():
+    """
+    the total number of users, from the count we keep in process rather
+    than a COUNT(*) every time
+    """
+    estimate = current_app.config['USERS_COUNT_ESTIMATE']
+    return counts.get(User.__tablename__,
+                      lambda: User.count(estimate=estimate))
+
+
+def _total_count(criteria):
+    """
+    X-Total-Count for a page of users: the count we keep in process when
+    the list isn't filtered, and a COUNT(*) of the matching rows only for
+    filtered lists that ask for one with ?total=true; None otherwise
+    """
+    if not criteria:
+        return _user_count()
+    if request.args.get('total', '').lower() in ('true', '1', 'yes'):
+        return db.session.query(func.count(User.id)).filter(
+            *criteria).scalar()
+    return None
+
+
 class UsersResource(Resource):
     """
     this Resource file is for our /users endpoints which don't require
@@ -49,27 +432,28 @@ class UsersResource(Resource):
         circles, to be a "private" method that shouldn't be directly called
         elsewhere. There's no true "private" arrangement in Python.
         """
-        proceed = True
-        errors = []
-
-        proceed, user_name, errors = _validate_field(
-            data, 'username', proceed, errors)
-        proceed, user_email, errors = _validate_field(
-            data, 'email', proceed, errors)
+        values, errors = user_schema.validate(data)
 
-        if proceed:
+        if not errors:
             user = User(
-                username=user_name,
-                email=user_email
+                username=values['username'],
+                email=values['email'],
+                sanitized=True
             )
             db.session.add(user)
             db.session.commit()
+            counts.add(User.__tablename__, 1)
             return user, errors
         else:
             return None, errors
 
     def post(self, *args, **kwargs):
-        user, errors = self._create_user(json.loads(request.data))
+        data, error = _load_json(
+            current_app.config['USERS_PAYLOAD_MAX_BYTES'])
+        if error is not None:
+            return error
+
+        user, errors = self._create_user(data)
         if user is not None:
             user_payload = _user_payload(user)
             user_payload['success'] = True
@@ -81,15 +465,75 @@ class UsersResource(Resource):
                 'errors': errors
             }, 400
 
+    @replica_reads
     def get(self, *args, **kwargs):
-        users = User.query.order_by(
-            User.username.asc()
-        ).all()
-        results = [_user_payload(user) for user in users]
+        criteria, errors = _filter_params(request.args)
+        if errors:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': errors
+            }, 400
+
+        fields, user_links, errors = _view_params(request.args)
+        if errors:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': errors
+            }, 400
+
+        stream_format = _stream_format()
+        if stream_format is not None:
+            etag, total = _stream_validators(criteria)
+            headers = _validator_headers(etag, None)
+            # how many users match; the ETag already counted them
+            headers['X-Total-Count'] = str(total)
+            if _not_modified(etag, None):
+                return Response(status=304, headers=headers)
+            response = _stream_users(
+                stream_format, fields, user_links, criteria)
+            response.headers.extend(headers)
+            return response
+
+        limit, cursor, errors = _page_params(request.args)
+        if errors:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': errors
+            }, 400
+
+        users, has_prev, has_next = _keyset_page(
+            User.query.filter(*criteria), limit, cursor)
+        etag = _page_validators(users, has_prev, has_next)
+        headers = _validator_headers(etag, None)
+        # how many users match, across every page
+        total = _total_count(criteria)
+        if total is not None:
+            headers['X-Total-Count'] = str(total)
+        if _not_modified(etag, None):
+            return Response(status=304, headers=headers)
+
+        links = {
+            'index': '/api/v1/users',
+            'next': None,
+            'prev': None,
+        }
+        if users and has_next:
+            links['next'] = _page_link(
+                _encode_cursor(users[-1], 'next'), limit)
+        if users and has_prev:
+            links['prev'] = _page_link(
+                _encode_cursor(users[0], 'prev'), limit)
+
+        serialize = _serializer().serialize
+        results = [serialize(user, fields, user_links) for user in users]
         return {
             'success': True,
-            'results': results
-        }, 200
+            'results': results,
+            'links': links
+        }, 200, headers
 
 
 class UserResource(Resource):
@@ -100,58 +544,371 @@ class UserResource(Resource):
     DELETE /users/3
     PATCH /users/18
     """
+    @replica_reads
     def get(self, *args, **kwargs):
-        user_id = int(bleach.clean(kwargs['user_id'].strip()))
-        user = None
-        try:
-            user = db.session.query(User).filter_by(id=user_id).one()
-        except NoResultFound:
-            return abort(404)
+        user_id = kwargs['user_id']
+        fields, links, errors = _view_params(request.args)
+        if errors:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': errors
+            }, 400
 
-        user_payload = _user_payload(user)
-        user_payload['success'] = True
-        return user_payload, 200
+        entry = _cached_entry(user_id)
+        if entry is None:
+            return abort(404)
+        return _entry_response(entry, fields, links)
 
     def patch(self, *args, **kwargs):
-        user_id = int(bleach.clean(kwargs['user_id'].strip()))
-        user = None
-        try:
-            user = db.session.query(User).filter_by(id=user_id).one()
-        except NoResultFound:
-            return abort(404)
+        user_id = kwargs['user_id']
 
-        proceed = True
-        errors = []
-        data = json.loads(request.data)
-        proceed, username, errors = _validate_field(
-            data, 'username', proceed, errors, missing_okay=True)
-        proceed, email, errors = _validate_field(
-            data, 'email', proceed, errors, missing_okay=True)
+        data, error = _load_json(
+            current_app.config['USERS_PAYLOAD_MAX_BYTES'])
+        if error is not None:
+            return error
 
-        if not proceed:
+        values, errors = user_schema.validate(data, partial=True)
+        if errors:
             return {
                 'success': False,
                 'error': 400,
                 'errors': errors
             }, 400
 
-        if username and len(username.strip()) > 0:
-            user.username = username
-        if email:
-            user.email = email
-        user.update()
+        if values:
+            # a single UPDATE (... RETURNING on Postgres) instead of loading
+            # the user first; no rows back means there's no such user
+            users = update_users({user_id: values})
+            db.session.commit()
+            cache.delete(User.cache_key(user_id))
+        else:
+            users = db.session.query(User).filter_by(id=user_id).all()
+        if not users:
+            return abort(404)
 
-        user_payload = _user_payload(user)
+        user_payload = _user_payload(users[0])
         user_payload['success'] = True
         return user_payload, 200
 
     def delete(self, *args, **kwargs):
         user_id = kwargs['user_id']
-        user = None
-        try:
-            user = db.session.query(User).filter_by(id=user_id).one()
-        except NoResultFound:
+        # a single DELETE instead of loading the user first; the rowcount
+        # tells us whether there was such a user
+        deleted = db.session.query(User).filter(
+            User.id == user_id
+        ).delete(synchronize_session='evaluate')
+        db.session.commit()
+        if not deleted:
             return abort(404)
 
-        user.delete()
+        cache.delete(User.cache_key(user_id))
+        counts.add(User.__tablename__, -deleted)
         return {}, 204
+
+
+class UsersCountResource(Resource):
+    """
+    the total number of users, without downloading them all
+    GET /users/count
+    """
+    def get(self, *args, **kwargs):
+        total = _user_count()
+        return {
+            'success': True,
+            'count': total
+        }, 200, {'X-Total-Count': str(total)}
+
+
+class UserLookupResource(Resource):
+    """
+    finds one user by a unique field rather than by id, through the same
+    cache as UserResource; subclasses say which field
+    """
+    field = None
+
+    @replica_reads
+    def get(self, *args, **kwargs):
+        fields, links, errors = _view_params(request.args)
+        if errors:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': errors
+            }, 400
+
+        # stored values have been sanitized, so the one we look up has to be
+        entry = _lookup_entry(self.field, sanitize(kwargs[self.field]))
+        if entry is None:
+            return abort(404)
+        return _entry_response(entry, fields, links)
+
+
+class UserByUsernameResource(UserLookupResource):
+    """
+    GET /users/by-username/ian
+    """
+    field = 'username'
+
+
+class UserByEmailResource(UserLookupResource):
+    """
+    GET /users/by-email/ian.douglas@iandouglas.com
+    """
+    field = 'email'
+
+
+class UsersBatchResource(Resource):
+    """
+    this Resource file is for our /users/batch endpoints which work on
+    many users in a single request and a single transaction
+    POST /users/batch
+    """
+    def _validate_ids(self, data):
+        """
+        reads the 'ids' list from a DELETE body, dropping duplicates
+        """
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not ids:
+            return None, ["required 'ids' parameter is missing"]
+        if not all(isinstance(user_id, int) and not isinstance(user_id, bool)
+                   for user_id in ids):
+            return None, ["'ids' parameter must be a list of integers"]
+        max_size = current_app.config['USERS_BATCH_MAX_SIZE']
+        if len(ids) > max_size:
+            return None, [f"'ids' parameter is limited to {max_size} users"]
+        return list(dict.fromkeys(ids)), []
+
+    def _validate_users(self, items):
+        """
+        validates every user in the batch, including uniqueness against each
+        other and (with a query per MAX_BIND_PARAMETERS worth of usernames
+        and emails) against the database; returns the rows
+        we can insert and a dict of errors keyed by position in the batch
+        """
+        rows = {}
+        errors = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors[index] = ['each user must be a JSON object']
+                continue
+
+            values, item_errors = user_schema.validate(item)
+            if item_errors:
+                errors[index] = item_errors
+            else:
+                rows[index] = values
+
+        taken = {'username': set(), 'email': set()}
+        # a username and an email to bind for each user
+        for chunk in chunked(list(rows.values()), 2):
+            usernames = [row['username'] for row in chunk]
+            emails = [row['email'] for row in chunk]
+            for username, email in db.session.query(
+                    User.username, User.email
+            ).filter(or_(User.username.in_(usernames),
+                         User.email.in_(emails))):
+                taken['username'].add(username)
+                taken['email'].add(email)
+
+        for index, row in list(rows.items()):
+            item_errors = [
+                f"'{field}' parameter must be unique"
+                for field in ('username', 'email')
+                if row[field] in taken[field]
+            ]
+            if item_errors:
+                errors[index] = item_errors
+                del rows[index]
+            else:
+                taken['username'].add(row['username'])
+                taken['email'].add(row['email'])
+
+        return rows, errors
+
+    def post(self, *args, **kwargs):
+        data, error = _load_json(
+            current_app.config['USERS_BATCH_PAYLOAD_MAX_BYTES'])
+        if error is not None:
+            return error
+
+        items = data.get('users') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': ["required 'users' parameter is missing"]
+            }, 400
+        max_size = current_app.config['USERS_BATCH_MAX_SIZE']
+        if len(items) > max_size:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': [f"'users' parameter is limited to {max_size} users"]
+            }, 400
+
+        rows, errors = self._validate_users(items)
+        created = {}
+        if rows:
+            now = datetime.datetime.utcnow()
+            try:
+                inserted = insert_users([
+                    dict(row, updated_at=now) for row in rows.values()
+                ])
+                db.session.commit()
+                counts.add(User.__tablename__, len(inserted))
+            except IntegrityError:
+                # someone else created one of these users since we checked
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'error': 409,
+                    'errors': ['users were created concurrently, try again']
+                }, 409
+            created = {user.username: user for user in inserted}
+
+        results = []
+        for index in range(len(items)):
+            if index in errors:
+                results.append({
+                    'success': False,
+                    'error': 400,
+                    'errors': errors[index]
+                })
+            else:
+                user_payload = _user_payload(
+                    created[rows[index]['username']])
+                user_payload['success'] = True
+                results.append(user_payload)
+
+        if not errors:
+            status_code = 201
+        elif created:
+            status_code = 207
+        else:
+            status_code = 400
+        return {
+            'success': not errors,
+            'results': results
+        }, status_code
+
+    def _validate_changes(self, items):
+        """
+        validates every change in a batch PATCH; returns the changes keyed
+        by user id and a dict of errors keyed by position in the batch
+        """
+        changes = {}
+        errors = {}
+        for index, item in enumerate(items):
+            user_id = item.get('id') if isinstance(item, dict) else None
+            if not isinstance(user_id, int) or isinstance(user_id, bool):
+                errors[index] = ["required 'id' parameter is missing"]
+                continue
+            if user_id in changes:
+                errors[index] = ["'id' parameter must be unique"]
+                continue
+
+            values, item_errors = user_schema.validate(item, partial=True)
+            if item_errors:
+                errors[index] = item_errors
+            else:
+                changes[user_id] = values
+        return changes, errors
+
+    def patch(self, *args, **kwargs):
+        data, error = _load_json(
+            current_app.config['USERS_BATCH_PAYLOAD_MAX_BYTES'])
+        if error is not None:
+            return error
+
+        items = data.get('users') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': ["required 'users' parameter is missing"]
+            }, 400
+        max_size = current_app.config['USERS_BATCH_MAX_SIZE']
+        if len(items) > max_size:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': [f"'users' parameter is limited to {max_size} users"]
+            }, 400
+
+        changes, errors = self._validate_changes(items)
+        updated = {}
+        if changes:
+            try:
+                rows = update_users(changes)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return {
+                    'success': False,
+                    'error': 409,
+                    'errors': [
+                        'usernames and emails must be unique, nothing updated'
+                    ]
+                }, 409
+            updated = {user.id: user for user in rows}
+            for user_id in updated:
+                cache.delete(User.cache_key(user_id))
+
+        results = []
+        for index, item in enumerate(items):
+            if index in errors:
+                results.append({
+                    'success': False,
+                    'error': 400,
+                    'errors': errors[index]
+                })
+            elif item['id'] not in updated:
+                results.append({
+                    'success': False,
+                    'error': 404,
+                    'message': 'resource not found'
+                })
+            else:
+                user_payload = _user_payload(updated[item['id']])
+                user_payload['success'] = True
+                results.append(user_payload)
+
+        succeeded = sum(1 for result in results if result['success'])
+        if succeeded == len(results):
+            status_code = 200
+        elif succeeded:
+            status_code = 207
+        else:
+            status_code = 400
+        return {
+            'success': succeeded == len(results),
+            'results': results
+        }, status_code
+
+    def delete(self, *args, **kwargs):
+        data, error = _load_json(
+            current_app.config['USERS_BATCH_PAYLOAD_MAX_BYTES'])
+        if error is not None:
+            return error
+
+        user_ids, errors = self._validate_ids(data)
+        if errors:
+            return {
+                'success': False,
+                'error': 400,
+                'errors': errors
+            }, 400
+
+        deleted = set(delete_users(user_ids))
+        db.session.commit()
+        counts.add(User.__tablename__, -len(deleted))
+        for user_id in deleted:
+            cache.delete(User.cache_key(user_id))
+
+        return {
+            'success': True,
+            'deleted': [user_id for user_id in user_ids if user_id in deleted],
+            'missing': [user_id for user_id in user_ids
+                        if user_id not in deleted]
+        }, 200
@@ -0,0 +1,33 @@
+import functools
+import re
+
+# the only characters bleach.clean() changes when they're on their own are
+# the C0 control characters (other than tab and newline) and '&', '<' and
+# '>'; text without any of them comes back from bleach untouched
+_NEEDS_CLEANING = re.compile('[\x00-\x08\x0b-\x1f&<>]')
+
+
+@functools.lru_cache(maxsize=4096)
+def _bleach_clean(value):
+    # bleach pulls in html5lib, which is slow to import and most requests
+    # never need it, so it's only imported the first time we do
+    import bleach
+    return bleach.clean(value)
+
+
+def clean(value):
+    """
+    same result as bleach.clean(value), but plain text skips the html5lib
+    tokenizer entirely and repeated values come out of a cache
+    """
+    if _NEEDS_CLEANING.search(value) is None:
+        return value
+    return _bleach_clean(value)
+
+
+def sanitize(value):
+    """
+    how we tidy up every string a user sends us: trim it, clean it, and
+    trim whatever whitespace cleaning may have uncovered
+    """
+    return clean(value.strip()).strip()
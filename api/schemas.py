@@ -0,0 +1,76 @@
+from api.database.models import User
+from api.sanitizer import sanitize
+from api.timing import timed
+
+
+class Field:
+    """
+    one string field in a request payload; everything a field needs to
+    check a value, including its error messages, is worked out once when
+    the schema is built rather than on every request
+    """
+    def __init__(self, name, max_length=None):
+        self.name = name
+        self.max_length = max_length
+        self.missing = f"required '{name}' parameter is missing"
+        self.blank = f"required '{name}' parameter is blank"
+        self.not_string = f"'{name}' parameter must be a string"
+        self.too_long = \
+            f"'{name}' parameter must be {max_length} characters or fewer"
+
+    @classmethod
+    def from_column(cls, column):
+        """
+        takes the length limit straight from the model, so anything too long
+        for the database never gets as far as the database
+        """
+        return cls(column.name, max_length=column.type.length)
+
+    def validate(self, value):
+        """
+        returns a (value, error) pair; the value is sanitized exactly once
+        """
+        if not isinstance(value, str):
+            return None, self.not_string
+        value = sanitize(value)
+        if not value:
+            return None, self.blank
+        if self.max_length is not None and len(value) > self.max_length:
+            return None, self.too_long
+        return value, None
+
+
+class Schema:
+    def __init__(self, *fields):
+        self.fields = fields
+
+    @timed('validation')
+    def validate(self, data, partial=False):
+        """
+        validates a whole payload in one pass and returns the sanitized
+        values along with a list of every error found; with partial=True
+        (for PATCH) missing fields are fine, but present ones still have to
+        be valid
+        """
+        if not isinstance(data, dict):
+            return {}, ['request body must be a JSON object']
+
+        values = {}
+        errors = []
+        for field in self.fields:
+            if field.name not in data:
+                if not partial:
+                    errors.append(field.missing)
+                continue
+            value, error = field.validate(data[field.name])
+            if error is None:
+                values[field.name] = value
+            else:
+                errors.append(error)
+        return values, errors
+
+
+user_schema = Schema(
+    Field.from_column(User.__table__.c.username),
+    Field.from_column(User.__table__.c.email),
+)
@@ -0,0 +1,171 @@
+import cProfile
+import importlib.util
+import os
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from prometheus_client import Histogram
+
+# pyinstrument is optional and only imported once a request asks for it
+HAS_PYINSTRUMENT = importlib.util.find_spec('pyinstrument') is not None
+
+# the order phases are listed in the Server-Timing header
+PHASES = ('routing', 'validation', 'db', 'serialization', 'total')
+
+REQUEST_PHASE_SECONDS = Histogram(
+    'api_request_phase_seconds',
+    'Time spent in each phase of handling a request',
+    ['resource', 'method', 'phase'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5),
+)
+
+
+def record(phase_name, seconds):
+    """
+    adds time to one phase of the current request; does nothing outside a
+    request or when timing is turned off
+    """
+    if has_request_context():
+        timings = g.get('timings')
+        if timings is not None:
+            timings[phase_name] = timings.get(phase_name, 0) + seconds
+
+
+@contextmanager
+def phase(phase_name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase_name, time.perf_counter() - start)
+
+
+def timed(phase_name):
+    """
+    decorator version of phase()
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(phase_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _RequestStart:
+    """
+    WSGI middleware that notes when a request arrived, before Flask has
+    done any routing
+    """
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        environ['api.request_start'] = time.perf_counter()
+        return self.wsgi_app(environ, start_response)
+
+
+def resource_name():
+    """
+    the Flask-RESTful resource handling this request, for metric labels
+    """
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None:
+        return 'none'
+    return getattr(view, 'view_class', view).__name__
+
+
+class _CProfiler:
+    suffix = 'prof'
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop(self, path):
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+
+
+class _PyinstrumentProfiler:
+    suffix = 'html'
+
+    def __init__(self):
+        import pyinstrument
+        self.profiler = pyinstrument.Profiler()
+        self.profiler.start()
+
+    def stop(self, path):
+        self.profiler.stop()
+        with open(path, 'w') as output:
+            output.write(self.profiler.output_html())
+
+
+def _start_profiler():
+    """
+    profiles the request when profiling is enabled, the client asked for it
+    with the PROFILE_HEADER header, and the request is picked by
+    PROFILE_SAMPLE_RATE; send 'pyinstrument' as the header value to use
+    pyinstrument (if it's installed) instead of cProfile
+    """
+    config = current_app.config
+    requested = request.headers.get(config['PROFILE_HEADER'])
+    if not config['PROFILING_ENABLED'] or not requested \
+            or random.random() >= config['PROFILE_SAMPLE_RATE']:
+        return None
+    if requested.lower() == 'pyinstrument' and HAS_PYINSTRUMENT:
+        return _PyinstrumentProfiler()
+    return _CProfiler()
+
+
+class Timing:
+    """
+    a Server-Timing header on every response, with where the time went
+    """
+    def init_app(self, app):
+        if not app.config['SERVER_TIMING']:
+            return
+        app.wsgi_app = _RequestStart(app.wsgi_app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        now = time.perf_counter()
+        g.request_start = request.environ.get('api.request_start', now)
+        g.timings = {'routing': now - g.request_start}
+        g.profiler = _start_profiler()
+
+    def _finish(self, response):
+        timings = g.pop('timings', None)
+        if timings is None:
+            return response
+        timings['total'] = time.perf_counter() - g.request_start
+
+        resource = resource_name()
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            directory = current_app.config['PROFILE_DIR']
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(
+                directory,
+                f'{resource}-{request.method}-{time.time():.6f}'
+                f'.{profiler.suffix}'
+            )
+            profiler.stop(path)
+            response.headers['X-Profile-File'] = path
+
+        response.headers['Server-Timing'] = ', '.join(
+            f'{name};dur={timings[name] * 1000:.3f}'
+            for name in PHASES if name in timings
+        )
+        for name, seconds in timings.items():
+            REQUEST_PHASE_SECONDS.labels(
+                resource, request.method, name).observe(seconds)
+        return response
+
+
+timing = Timing()
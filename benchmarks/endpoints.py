@@ -0,0 +1,373 @@
+"""
+latency, throughput and allocations for every user API endpoint
+
+seeds --rows users with COPY (or executemany on SQLite), then sends --requests
+requests to each endpoint and method, first through Flask's test client and
+then over HTTP to a real WSGI server (werkzeug's, threaded, in this
+process), and saves the results as JSON next to the git commit they came
+from:
+
+DATABASE_URL=postgresql://localhost:5432/yourdatabase_bench \\
+    python3 -m benchmarks.endpoints --rows 100000 --requests 500
+
+point DATABASE_URL at a scratch database: the users table is dropped and
+created again. Compare two runs with:
+
+python3 -m benchmarks.endpoints --compare before.json after.json
+
+allocations are counted with tracemalloc in a separate, shorter pass through
+the test client, since tracing slows everything else down; that pass needs
+tracemalloc.reset_peak(), so it's skipped on Python 3.8
+"""
+import argparse
+import datetime
+import http.client
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+
+from werkzeug.serving import make_server
+
+from api import create_app, db
+from api.database.bulk import copy_users
+
+SEED_BATCH_SIZE = 10000
+BATCH_SIZE = 100
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    for start in range(0, rows, SEED_BATCH_SIZE):
+        copy_users([
+            {'username': f'bench{n:07d}', 'email': f'bench{n:07d}@example.com'}
+            for n in range(start, min(start + SEED_BATCH_SIZE, rows))
+        ])
+        db.session.commit()
+    first_id = db.session.execute('SELECT min(id) FROM users').scalar()
+    return list(range(first_id, first_id + rows))
+
+
+class Cases:
+    """
+    every endpoint and method we measure; each case builds the i-th
+    request as a (path, JSON body) pair, and the write cases clean up
+    after themselves so every client sees the same data
+    """
+    def __init__(self, ids, tag):
+        self.ids = ids
+        # keeps the rows each client creates apart from the other client's
+        self.tag = tag
+        self.created = []
+        self.batch_created = []
+
+    def _user(self, i):
+        n = self.ids[i % len(self.ids)] - self.ids[0]
+        return self.ids[0] + n, f'bench{n:07d}', f'bench{n:07d}@example.com'
+
+    def reads(self):
+        return [
+            ('GET', 'users page', lambda i: (
+                '/api/v1/users?limit=50', None)),
+            ('GET', 'users search username_prefix', lambda i: (
+                f'/api/v1/users?username_prefix={self._user(i)[1][:-2]}',
+                None)),
+            ('GET', 'users search email_domain', lambda i: (
+                '/api/v1/users?email_domain=example.com&limit=50', None)),
+            ('GET', 'user by id', lambda i: (
+                f'/api/v1/users/{self._user(i)[0]}', None)),
+            ('GET', 'user by username', lambda i: (
+                f'/api/v1/users/by-username/{self._user(i)[1]}', None)),
+            ('GET', 'user by email', lambda i: (
+                f'/api/v1/users/by-email/{self._user(i)[2]}', None)),
+            ('GET', 'healthz', lambda i: ('/healthz', None)),
+            ('GET', 'metrics', lambda i: ('/metrics', None)),
+        ]
+
+    def streams(self):
+        return [
+            ('GET', 'users stream ndjson', lambda i: (
+                '/api/v1/users?stream=ndjson', None)),
+        ]
+
+    def writes(self):
+        return [
+            ('POST', 'create user', self._create),
+            # writes the same email back, so later lookups still find it
+            ('PATCH', 'patch user', lambda i: (
+                f'/api/v1/users/{self._user(i)[0]}',
+                {'email': self._user(i)[2]})),
+            ('DELETE', 'delete user', lambda i: (
+                f'/api/v1/users/{self.created.pop()}', None)),
+            ('POST', 'batch create users', self._batch_create),
+            ('PATCH', 'batch patch users', lambda i: (
+                '/api/v1/users/batch',
+                {'users': [
+                    {'id': user_id, 'email': email}
+                    for user_id, _, email in map(
+                        self._user, range(i * BATCH_SIZE, (i + 1) * BATCH_SIZE)
+                    )
+                ]})),
+            ('DELETE', 'batch delete users', lambda i: (
+                '/api/v1/users/batch', {'ids': self.batch_created.pop()})),
+        ]
+
+    def _create(self, i):
+        return '/api/v1/users', {
+            'username': f'new-{self.tag}-{i}',
+            'email': f'new-{self.tag}-{i}@example.com',
+        }
+
+    def _batch_create(self, i):
+        return '/api/v1/users/batch', {'users': [
+            {'username': f'batch-{self.tag}-{i}-{n}',
+             'email': f'batch-{self.tag}-{i}-{n}@example.com'}
+            for n in range(BATCH_SIZE)
+        ]}
+
+    def created_user(self, name, status, data):
+        # remember what the create cases made, for the delete cases
+        if name == 'create user' and status == 201:
+            self.created.append(json.loads(data)['id'])
+        elif name == 'batch create users' and status == 201:
+            self.batch_created.append(
+                [user['id'] for user in json.loads(data)['results']])
+
+
+class TestClient:
+    name = 'test_client'
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class WSGIServer:
+    name = 'wsgi_server'
+
+    def __init__(self, app):
+        # one log line per request would drown out the results
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.port = self.server.server_port
+
+    def send(self, method, path, body):
+        # a new connection per request, like a client without keep-alive
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        return response.status, data
+
+    def close(self):
+        self.server.shutdown()
+        self.thread.join()
+
+
+def percentile(latencies, pct):
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100)[pct - 1]
+
+
+def measure(client, cases, method, name, build, count):
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(count):
+        path, body = build(i)
+        start = time.perf_counter()
+        status, data = client.send(method, path, body)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors += 1
+        cases.created_user(name, status, data)
+    elapsed = time.perf_counter() - started
+    return {
+        'client': client.name,
+        'method': method,
+        'case': name,
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+    }
+
+
+def measure_allocations(client, cases, method, name, build, count):
+    """
+    average bytes allocated (and still allocated at the peak) per request
+    """
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    try:
+        for i in range(count):
+            path, body = build(i)
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            status, data = client.send(method, path, body)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            blocks.append(sum(
+                stat.count_diff for stat in
+                tracemalloc.take_snapshot().compare_to(before, 'filename')
+                if stat.count_diff > 0
+            ))
+            cases.created_user(name, status, data)
+    finally:
+        tracemalloc.stop()
+    return {
+        'alloc_peak_kb': round(statistics.mean(peaks) / 1024, 1),
+        'alloc_blocks': round(statistics.mean(blocks)),
+    }
+
+
+def run_client(client, cases, args):
+    plan = [(case, args.requests) for case in cases.reads()] + \
+        [(case, args.stream_requests) for case in cases.streams()] + \
+        [(case, args.write_requests) for case in cases.writes()]
+    results = []
+    for (method, name, build), count in plan:
+        result = measure(client, cases, method, name, build, count)
+        print(f'{client.name:<12} {method:<7} {name:<32} '
+              f'{result["rps"]:>9.1f} {result["p50_ms"]:>9.2f} '
+              f'{result["p99_ms"]:>9.2f} {result["errors"]:>6}')
+        results.append(result)
+    return results
+
+
+def run_allocations(client, cases, args, results):
+    by_case = {(result['method'], result['case']): result
+               for result in results if result['client'] == client.name}
+    plan = cases.reads() + cases.streams() + cases.writes()
+    for method, name, build in plan:
+        by_case[(method, name)].update(measure_allocations(
+            client, cases, method, name, build, args.alloc_requests))
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], text=True).strip()
+        dirty = bool(subprocess.check_output(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(before_path, after_path):
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print(f'{before["commit"]} -> {after["commit"]}')
+    old = {(r['client'], r['method'], r['case']): r
+           for r in before['results']}
+    for result in after['results']:
+        key = (result['client'], result['method'], result['case'])
+        if key not in old:
+            continue
+        changes = []
+        for stat in ('rps', 'p50_ms', 'p99_ms'):
+            if old[key][stat]:
+                change = (result[stat] - old[key][stat]) / old[key][stat]
+                changes.append(f'{stat} {change:+7.1%}')
+        print(f'{key[0]:<12} {key[1]:<7} {key[2]:<32} ' + '  '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000,
+                        help='users to seed, such as 1000, 100000, 1000000')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--write-requests', type=int, default=50)
+    parser.add_argument('--stream-requests', type=int, default=5)
+    parser.add_argument('--alloc-requests', type=int, default=5)
+    parser.add_argument('--clients', nargs='+',
+                        default=['test_client', 'wsgi_server'],
+                        choices=['test_client', 'wsgi_server'])
+    parser.add_argument('--config', default='testing')
+    parser.add_argument('--output', help='defaults to '
+                        'benchmarks/results/<time>-<commit>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    app = create_app(args.config)
+    with app.app_context():
+        start = time.perf_counter()
+        ids = seed(args.rows)
+        seed_seconds = time.perf_counter() - start
+        dialect = db.engine.dialect.name
+    print(f'seeded {args.rows} users in {seed_seconds:.1f}s ({dialect})')
+    print(f'{"client":<12} {"method":<7} {"case":<32} {"req/s":>9} '
+          f'{"p50 ms":>9} {"p99 ms":>9} {"errors":>6}')
+
+    results = []
+    for client_name in args.clients:
+        client = (TestClient if client_name == 'test_client'
+                  else WSGIServer)(app)
+        try:
+            results.extend(run_client(client, Cases(ids, client_name), args))
+            if client_name == 'test_client' and args.alloc_requests:
+                if hasattr(tracemalloc, 'reset_peak'):
+                    run_allocations(client, Cases(ids, 'allocations'), args,
+                                    results)
+                else:
+                    print('skipping allocations: tracemalloc.reset_peak() '
+                          'needs Python 3.9')
+        finally:
+            client.close()
+
+    commit, dirty = git_commit()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'database': dialect,
+        'config': args.config,
+        'rows': args.rows,
+        'seed_seconds': round(seed_seconds, 2),
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        'benchmarks', 'results',
+        f'{datetime.datetime.utcnow():%Y%m%dT%H%M%S}-{(commit or "none")[:7]}'
+        f'.json'
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f'saved {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+compares the gunicorn worker profiles in gunicorn_config.py under load
+
+starts gunicorn once per profile against DATABASE_URL, points a pile of
+client threads at a mix of single-user and collection GETs for a while,
+and prints requests per second and latency percentiles for each:
+
+DATABASE_URL=postgresql://... python3 -m benchmarks.load \\
+    --profiles sync gthread gevent --clients 50 --seconds 30
+
+profiles whose worker class isn't installed (gevent, usually) are skipped;
+seed some users first (manage.py db_seed) so the GETs have rows to read
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+
+REQUIRES = {'gevent': 'gevent'}
+
+
+def wait_until_up(url, seconds=30):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f'gunicorn never answered {url}')
+
+
+def client(base_url, paths, deadline, latencies, errors):
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            urllib.request.urlopen(base_url + path, timeout=30).read()
+        except urllib.error.HTTPError as error:
+            if error.code >= 500:
+                errors.append(error.code)
+        except (urllib.error.URLError, ConnectionError) as error:
+            errors.append(str(error))
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] * 1000
+
+
+def run_profile(profile, args):
+    env = dict(os.environ, GUNICORN_PROFILE=profile,
+               WEB_CONCURRENCY=str(args.workers))
+    base_url = f'http://127.0.0.1:{args.port}'
+    server = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn_config.py',
+         '--bind', f'127.0.0.1:{args.port}', 'run:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(base_url + '/healthz')
+        paths = [f'/api/v1/users/{n}' for n in range(1, 11)] + \
+            ['/api/v1/users?limit=20']
+        latencies, errors = [], []
+        deadline = time.monotonic() + args.seconds
+        threads = [
+            threading.Thread(target=client, args=(
+                base_url, paths, deadline, latencies, errors))
+            for _ in range(args.clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f'{profile:<8} {len(latencies) / args.seconds:>9.1f} '
+          f'{percentile(latencies, 50):>9.2f} '
+          f'{percentile(latencies, 99):>9.2f} {len(errors):>7}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profiles', nargs='+',
+                        default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=int, default=30)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f'{args.workers} workers, {args.clients} clients, '
+          f'{args.seconds}s per profile')
+    print(f'{"profile":<8} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} '
+          f'{"errors":>7}')
+    for profile in args.profiles:
+        module = REQUIRES.get(profile)
+        if module and importlib.util.find_spec(module) is None:
+            print(f'{profile:<8} skipped, {module} is not installed')
+            continue
+        run_profile(profile, args)
+
+
+if __name__ == '__main__':
+    main()
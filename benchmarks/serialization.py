@@ -0,0 +1,86 @@
+"""
+per-row serialization cost for the users collection
+
+compares the old hand-built _user_payload() with UserSerializer, with and
+without the links block, over N fake rows (no database involved), then
+how long each JSON backend takes to encode them; orjson is skipped if it
+isn't installed:
+
+python3 -m benchmarks.serialization --rows 100000
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+from api.codec import make_backend, orjson
+from api.serializers import UserSerializer
+
+
+def legacy_payload(user):
+    # _user_payload() as it was before UserSerializer
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'links': {
+            'get': f'/api/v1/users/{user.id}',
+            'patch': f'/api/v1/users/{user.id}',
+            'delete': f'/api/v1/users/{user.id}',
+            'index': '/api/v1/users',
+        }
+    }
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    users = [
+        SimpleNamespace(id=index, username=f'user {index}',
+                        email=f'user{index}@example.com')
+        for index in range(args.rows)
+    ]
+    serializer = UserSerializer('/api/v1/users/<int:user_id>',
+                                '/api/v1/users')
+    serialize = serializer.serialize
+    cases = {
+        'legacy _user_payload': lambda: [
+            legacy_payload(user) for user in users],
+        'UserSerializer': lambda: [serialize(user) for user in users],
+        'UserSerializer links=false': lambda: [
+            serialize(user, None, False) for user in users],
+        'UserSerializer fields=id,username': lambda: [
+            serialize(user, ('id', 'username')) for user in users],
+    }
+
+    print(f'{args.rows} rows, best of {args.repeat}')
+    for name, func in cases.items():
+        seconds = best_of(args.repeat, func)
+        print(f'{name:36} {seconds * 1000:8.1f} ms '
+              f'{seconds / args.rows * 1e9:8.0f} ns/row')
+
+    for backend_name in ('stdlib', 'orjson'):
+        if backend_name == 'orjson' and orjson is None:
+            print(f'{"encode with orjson":36} skipped, orjson is not '
+                  'installed')
+            continue
+        backend = make_backend(backend_name)
+        payloads = [serialize(user) for user in users]
+        seconds = best_of(args.repeat, lambda: backend.dumps(payloads))
+        print(f'{"encode with " + backend_name:36} {seconds * 1000:8.1f} ms '
+              f'{seconds / args.rows * 1e9:8.0f} ns/row')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+how long the app takes to import and how much memory each gunicorn worker
+costs, with and without --preload
+
+python3 -m benchmarks.startup --workers 4
+
+import time is the best of several fresh interpreters importing run.py;
+the slowest imports come from python -X importtime. Worker memory is read
+from /proc, so that part only works on Linux: RSS counts pages shared with
+the master, USS is what's private to the worker, and PSS splits shared pages
+evenly between the processes using them
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_RUN = 'import time; s = time.perf_counter(); import run; ' \
+    'print(time.perf_counter() - s)'
+
+
+def import_seconds(repeat):
+    return min(
+        float(subprocess.check_output([sys.executable, '-c', IMPORT_RUN]))
+        for _ in range(repeat)
+    )
+
+
+def slowest_imports(count):
+    # -X importtime lines look like 'import time: self | cumulative | name'
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import run'],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    timings = []
+    for line in output.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)',
+                         line)
+        # only the top-level packages, not every module inside them
+        if match and len(match.group(3)) <= 4:
+            timings.append((int(match.group(2)), match.group(4)))
+    return sorted(timings, reverse=True)[:count]
+
+
+def memory_kb(pid):
+    totals = {'rss': 0, 'pss': 0, 'uss': 0}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            name, _, value = line.partition(':')
+            kb = int(value.split()[0]) if value.strip() else 0
+            if name == 'Rss':
+                totals['rss'] += kb
+            elif name == 'Pss':
+                totals['pss'] += kb
+            elif name in ('Private_Clean', 'Private_Dirty'):
+                totals['uss'] += kb
+    return totals
+
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def worker_memory(preload, args):
+    env = dict(os.environ, GUNICORN_PROFILE='sync',
+               GUNICORN_PRELOAD=str(preload).lower(),
+               WEB_CONCURRENCY=str(args.workers))
+    server = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn_config.py',
+         '--bind', f'127.0.0.1:{args.port}', 'run:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while len(worker_pids(server.pid)) < args.workers \
+                and time.monotonic() < deadline:
+            time.sleep(0.2)
+        # let every worker finish loading and serve a request or two
+        for _ in range(args.workers * 4):
+            try:
+                urllib.request.urlopen(
+                    f'http://127.0.0.1:{args.port}/healthz', timeout=5).read()
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.5)
+        workers = [memory_kb(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        stat: sum(worker[stat] for worker in workers) / len(workers)
+        for stat in ('rss', 'pss', 'uss')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    print(f'import run: {import_seconds(args.repeat) * 1000:.1f} ms '
+          f'(best of {args.repeat})')
+    print('slowest top-level imports:')
+    for micros, name in slowest_imports(8):
+        print(f'  {micros / 1000:>8.1f} ms  {name}')
+
+    if not sys.platform.startswith('linux'):
+        print('worker memory needs /proc; skipping')
+        return
+    print(f'average per worker, {args.workers} sync workers:')
+    print(f'  {"":<11} {"RSS MB":>8} {"PSS MB":>8} {"USS MB":>8}')
+    for preload in (False, True):
+        memory = worker_memory(preload, args)
+        label = 'preload' if preload else 'no preload'
+        print(f'  {label:<11} {memory["rss"] / 1024:>8.1f} '
+              f'{memory["pss"] / 1024:>8.1f} {memory["uss"] / 1024:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
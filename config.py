@@ -1,27 +1,209 @@
 import os
+import sqlite3
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
+def engine_options(database_url, pool_size, max_overflow, pool_timeout,
+                   pool_recycle, pool_pre_ping):
+    """
+    builds SQLALCHEMY_ENGINE_OPTIONS for a config class; the DB_POOL_*
+    environment variables win over the defaults each class passes in, and
+    DB_POOL_MIN_SIZE raises the default pool size without lowering it
+
+    SQLite doesn't use a queue pool, so it only gets the options that make
+    sense for it
+    """
+    options = {
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', pool_recycle)),
+        'pool_pre_ping': os.environ.get(
+            'DB_POOL_PRE_PING', str(pool_pre_ping)).lower() == 'true',
+    }
+    if database_url and not database_url.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', max(
+                pool_size, int(os.environ.get('DB_POOL_MIN_SIZE', 0))))),
+            'max_overflow': int(
+                os.environ.get('DB_POOL_MAX_OVERFLOW', max_overflow)),
+            'pool_timeout': int(
+                os.environ.get('DB_POOL_TIMEOUT', pool_timeout)),
+        })
+    return options
+
+
+def replica_binds(urls):
+    """
+    SQLALCHEMY_BINDS for a comma separated list of read replica URLs, named
+    replica_1, replica_2 and so on
+    """
+    urls = [url.strip() for url in (urls or '').split(',') if url.strip()]
+    return {f'replica_{n}': url for n, url in enumerate(urls, 1)}
+
+
+def cors_origins(origins):
+    """
+    CORS_ORIGINS for a comma separated list of origins, such as
+    'https://a.example.com, https://b.example.com'
+    """
+    return [origin.strip() for origin in origins.split(',')
+            if origin.strip()]
+
+
+def testing_database_url():
+    """
+    TEST_DATABASE=memory runs the tests against an in-memory SQLite
+    database and TEST_DATABASE=sqlite against a SQLite file; either way,
+    each pytest-xdist worker gets a database of its own. Otherwise the tests
+    use DATABASE_URL
+    """
+    mode = os.environ.get('TEST_DATABASE')
+    if mode == 'memory':
+        # tests.DatabaseTestCase connects this with testing_memory_database()
+        return 'sqlite://'
+    if mode == 'sqlite':
+        return 'sqlite:///' + os.path.join(
+            basedir, f'test-{_test_worker()}.db')
+    return os.environ.get('DATABASE_URL')
+
+
+def testing_memory_database():
+    """
+    connects to this worker's in-memory database; it's named and shared, so
+    it lives on for as long as any connection to it stays open, across all
+    the apps the tests create. Flask-SQLAlchemy turns every SQLite URL
+    except sqlite:// into a file path, so this can't be a URL
+    """
+    return sqlite3.connect(
+        f'file:test-{_test_worker()}?mode=memory&cache=shared', uri=True,
+        check_same_thread=False)
+
+
+def _test_worker():
+    return os.environ.get('PYTEST_XDIST_WORKER', 'main')
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'really hard to guess string'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = True
+    # Flask-SQLAlchemy's query recording keeps every statement of a request
+    # in memory; it's for debugging, so only the dev and test configs use it
+    SQLALCHEMY_RECORD_QUERIES = False
+
+    # CORS headers for every response; CORS_ORIGINS is '*' or a comma
+    # separated list of origins, and browsers can skip the preflight before
+    # a PATCH or DELETE for CORS_MAX_AGE seconds after the first one
+    CORS_ORIGINS = cors_origins(os.environ.get('CORS_ORIGINS', '*'))
+    CORS_ALLOW_HEADERS = 'Content-Type'
+    CORS_ALLOW_METHODS = 'GET, PATCH, POST, DELETE, OPTIONS'
+    CORS_MAX_AGE = int(os.environ.get('CORS_MAX_AGE', 86400))
+
+    # request counts, latencies, sizes and status codes, in-flight requests
+    # and pool checkout waits, exported at /metrics
+    REQUEST_METRICS = os.environ.get(
+        'REQUEST_METRICS', 'true').lower() == 'true'
+
+    # per-endpoint query counts and latencies, exported at /metrics; only
+    # QUERY_SAMPLE_RATE (0 to 1) of requests are measured
+    QUERY_INSTRUMENTATION = os.environ.get(
+        'QUERY_INSTRUMENTATION', 'true').lower() == 'true'
+    QUERY_SAMPLE_RATE = float(os.environ.get('QUERY_SAMPLE_RATE', 1.0))
+
+    # Server-Timing headers and per-resource timing histograms
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() == 'true'
+    # when enabled, a request sent with the PROFILE_HEADER header is
+    # profiled (if picked by PROFILE_SAMPLE_RATE) and the profile is saved
+    # in PROFILE_DIR
+    PROFILING_ENABLED = os.environ.get(
+        'PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_HEADER = 'X-Profile'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or \
+        os.path.join(basedir, 'profiles')
+
+    # keyset pagination for GET /api/v1/users
+    USERS_PAGE_SIZE = int(os.environ.get('USERS_PAGE_SIZE', 50))
+    USERS_MAX_PAGE_SIZE = int(os.environ.get('USERS_MAX_PAGE_SIZE', 500))
+    # rows fetched per round trip (and per response chunk) when streaming
+    USERS_STREAM_BATCH_SIZE = int(
+        os.environ.get('USERS_STREAM_BATCH_SIZE', 1000))
+
+    # most users accepted by one POST /api/v1/users/batch request
+    USERS_BATCH_MAX_SIZE = int(os.environ.get('USERS_BATCH_MAX_SIZE', 5000))
+
+    # request bodies bigger than these are turned away with a 413 before
+    # we parse them; MAX_CONTENT_LENGTH is Flask's own app-wide limit
+    USERS_PAYLOAD_MAX_BYTES = int(
+        os.environ.get('USERS_PAYLOAD_MAX_BYTES', 4 * 1024))
+    USERS_BATCH_PAYLOAD_MAX_BYTES = int(
+        os.environ.get('USERS_BATCH_PAYLOAD_MAX_BYTES', 2 * 1024 * 1024))
+    MAX_CONTENT_LENGTH = USERS_BATCH_PAYLOAD_MAX_BYTES
+
+    # JSON encoder/decoder for request bodies and responses: 'auto' uses
+    # orjson when it's installed and the standard library otherwise
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+
+    # read-through cache for single user lookups; CACHE_BACKEND can be
+    # 'local' (per worker), 'shared' (redis at CACHE_REDIS_URL, or a local
+    # stand-in if that's not set) or 'null' to turn caching off
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 60))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL')
+
+    # the user count behind GET /api/v1/users/count is kept in process and
+    # read from the database again after this many seconds; on Postgres,
+    # USERS_COUNT_ESTIMATE=true reads the planner's estimate instead of
+    # running COUNT(*), which is much cheaper on a very big table
+    COUNT_RECONCILE_SECONDS = int(
+        os.environ.get('COUNT_RECONCILE_SECONDS', 60))
+    USERS_COUNT_ESTIMATE = os.environ.get(
+        'USERS_COUNT_ESTIMATE', 'false').lower() == 'true'
+
+    # read replicas for GET /api/v1/users and GET /api/v1/users/<id>, used
+    # in turn; writes always go to the primary, and so do a client's reads
+    # for DATABASE_REPLICA_LAG seconds after it writes something, so it
+    # sees its own changes even when the replicas are a little behind
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get('DATABASE_REPLICA_URLS'))
+    DATABASE_REPLICAS = list(SQLALCHEMY_BINDS)
+    DATABASE_REPLICA_LAG = int(os.environ.get('DATABASE_REPLICA_LAG', 5))
+    DATABASE_PRIMARY_COOKIE = 'db_primary'
+
+    # how many pooled database connections to open when the app starts, so
+    # the first requests after a deploy don't each pay for a new connection
+    SQLALCHEMY_POOL_WARMUP = int(os.environ.get('DB_POOL_WARMUP', 0))
 
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    SQLALCHEMY_RECORD_QUERIES = True
+    PROFILING_ENABLED = os.environ.get(
+        'PROFILING_ENABLED', 'true').lower() == 'true'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=5, max_overflow=5,
+        pool_timeout=30, pool_recycle=3600, pool_pre_ping=False)
 
 
 class TestingConfig(Config):
     DEBUG = True
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_RECORD_QUERIES = True
+    SQLALCHEMY_DATABASE_URI = testing_database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=2, max_overflow=2,
+        pool_timeout=5, pool_recycle=3600, pool_pre_ping=False)
+
 
 class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    # pre-ping and recycling mean a Postgres failover or maintenance window
+    # costs us stale pooled connections, not failed requests
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(
+        SQLALCHEMY_DATABASE_URI, pool_size=10, max_overflow=10,
+        pool_timeout=10, pool_recycle=1800, pool_pre_ping=True)
+    SQLALCHEMY_POOL_WARMUP = int(os.environ.get('DB_POOL_WARMUP', 2))
+    QUERY_SAMPLE_RATE = float(os.environ.get('QUERY_SAMPLE_RATE', 0.1))
 
 
 config = {
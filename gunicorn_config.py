@@ -0,0 +1,142 @@
+"""
+gunicorn settings; the Procfile runs 'gunicorn -c gunicorn_config.py run:app'
+
+GUNICORN_PROFILE picks how each worker handles requests:
+
+- 'sync': one request at a time per worker process, the gunicorn default
+- 'gthread': GUNICORN_THREADS requests at a time per worker, in threads
+- 'gevent': up to GUNICORN_WORKER_CONNECTIONS requests at a time per worker,
+  in green threads; needs gevent (and psycogreen, so psycopg2 yields while
+  it waits on Postgres)
+
+without GUNICORN_PROFILE, production (FLASK_CONFIG=production) uses gevent
+when it's installed and gthread when it isn't; everything else uses sync
+
+sync and gthread workers are forked from an app the master has already
+loaded (--preload), so they share its memory until they write to it;
+GUNICORN_PRELOAD=false turns that off
+"""
+import gc
+import importlib.util
+import os
+
+# don't import config.py here: it reads the DB_POOL_* variables when it's
+# imported, and this file may set DB_POOL_MIN_SIZE below
+environment = os.environ.get('FLASK_CONFIG', 'default')
+
+
+def _installed(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def _default_profile():
+    if environment != 'production':
+        return 'sync'
+    return 'gevent' if _installed('gevent') else 'gthread'
+
+
+PROFILES = {
+    'sync': {
+        'worker_class': 'sync',
+        'threads': 1,
+        'keepalive': 2,
+        'preload_app': True,
+    },
+    'gthread': {
+        'worker_class': 'gthread',
+        'threads': int(os.environ.get('GUNICORN_THREADS', 4)),
+        'keepalive': 5,
+        'preload_app': True,
+    },
+    'gevent': {
+        'worker_class': 'gevent',
+        'threads': 1,
+        'keepalive': 5,
+        # gevent patches the standard library when each worker starts, which
+        # has to happen before the app (and SQLAlchemy's pool) is imported
+        'preload_app': False,
+    },
+}
+
+profile = os.environ.get('GUNICORN_PROFILE') or _default_profile()
+if profile not in PROFILES:
+    raise ValueError(f'unknown GUNICORN_PROFILE {profile!r}')
+settings = PROFILES[profile]
+
+# gunicorn and Heroku both understand WEB_CONCURRENCY
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = settings['worker_class']
+threads = settings['threads']
+keepalive = settings['keepalive']
+preload_app = os.environ.get(
+    'GUNICORN_PRELOAD', str(settings['preload_app'])).lower() == 'true'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# every thread in a gthread worker can hold a connection at once, so give
+# the pool at least that many; a config class that asks for more keeps its
+# pool size, and an explicit DB_POOL_SIZE still wins
+if worker_class == 'gthread':
+    os.environ.setdefault('DB_POOL_MIN_SIZE', str(threads))
+
+
+def _pool_capacity():
+    """
+    how many connections a worker's pool can hand out at once, or None if
+    it doesn't limit them (SQLite's doesn't)
+    """
+    # imported here rather than at the top: config.py reads DB_POOL_MIN_SIZE
+    # when it's imported, and that may only just have been set above
+    from config import config
+    options = config[environment].SQLALCHEMY_ENGINE_OPTIONS
+    if 'pool_size' not in options:
+        return None
+    return options['pool_size'] + options['max_overflow']
+
+
+# green threads are cheap, database connections aren't; anything past the
+# pool's capacity waits up to DB_POOL_TIMEOUT for a connection and then
+# fails, so a gevent worker only takes on as many requests as it can get
+# connections for (an explicit GUNICORN_WORKER_CONNECTIONS still wins)
+worker_connections = int(os.environ.get(
+    'GUNICORN_WORKER_CONNECTIONS',
+    (_pool_capacity() if worker_class == 'gevent' else None) or 100))
+
+
+if preload_app:
+    # no point collecting garbage while the app loads; everything it
+    # allocates lives as long as the workers do
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        # move everything the app allocated out of the collector's sight
+        # before forking, so collections in the workers don't touch (and
+        # copy) the memory pages they share with the master
+        gc.freeze()
+        gc.enable()
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning(
+            'psycogreen is not installed; psycopg2 will block the whole '
+            'gevent worker while it waits on Postgres')
+    else:
+        patch_psycopg()
+
+
+def post_worker_init(worker):
+    # runs in each worker once it has loaded (or inherited) the app
+    from api import prepare_worker
+    prepare_worker(worker.wsgi)
+
+
+def child_exit(server, worker):
+    # stop reporting a dead worker's in-flight requests at /metrics
+    from api.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -1,7 +1,9 @@
 from flask_script import Manager
 from flask_migrate import Migrate, MigrateCommand
+from sqlalchemy import func
 
 from api import create_app, db
+from api.database.bulk import copy_users
 from api.database.models import User
 from tests import db_drop_everything
 
@@ -18,8 +20,12 @@ def routes():
     print(app.url_map)
 
 
-@manager.command
-def db_seed():
+SEED_BATCH_SIZE = 10000
+
+
+@manager.option('-c', '--count', dest='count', type=int, default=0,
+                help='how many synthetic users to add, for load testing')
+def db_seed(count=0):
     db_drop_everything(db)
     db.create_all()
 
@@ -28,7 +34,21 @@ def db_seed():
     db.session.add(user)
 
     db.session.commit()
-    print(f'obj count: {len(db.session.query(User).all())}')
+
+    # synthetic users go in a batch at a time, committing as we go, so a
+    # million of them never sit in memory (or one transaction) at once
+    for start in range(0, count, SEED_BATCH_SIZE):
+        stop = min(start + SEED_BATCH_SIZE, count)
+        copy_users([
+            {'username': f'user{n:07d}', 'email': f'user{n:07d}@example.com'}
+            for n in range(start, stop)
+        ])
+        db.session.commit()
+        print(f'\rseeded {stop}/{count} users', end='', flush=True)
+    if count:
+        print()
+
+    print(f'obj count: {db.session.query(func.count(User.id)).scalar()}')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,33 @@
+"""indexes for username prefix and email domain searches
+
+Revision ID: c3f1a8d27e64
+Revises: b7d2e41f9c05
+Create Date: 2020-10-16 11:02:48.271093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1a8d27e64'
+down_revision = 'b7d2e41f9c05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # gin_trgm_ops comes from the pg_trgm extension; other databases just
+    # get plain indexes
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_users_username_pattern', 'users', ['username'],
+                    postgresql_ops={'username': 'text_pattern_ops'})
+    op.create_index('ix_users_email_trgm', 'users', ['email'],
+                    postgresql_using='gin',
+                    postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_users_email_trgm', table_name='users')
+    op.drop_index('ix_users_username_pattern', table_name='users')
@@ -0,0 +1,25 @@
+"""index users.updated_at
+
+Revision ID: e5a9c04b1d37
+Revises: c3f1a8d27e64
+Create Date: 2020-10-19 10:14:05.803126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c04b1d37'
+down_revision = 'c3f1a8d27e64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # max(updated_at) for the ETag on streamed user lists
+    op.create_index('ix_users_updated_at', 'users', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_users_updated_at', table_name='users')
@@ -1,3 +1,5 @@
+import os
+
 from api import create_app
 
 '''
@@ -7,7 +9,8 @@ line manually, and use it in your Heroku Procfile to run in production.
 python3 run.py
 '''
 
-app = create_app()
+# FLASK_CONFIG is one of the names in config.py, such as 'production'
+app = create_app(os.environ.get('FLASK_CONFIG', 'default'))
 
 if __name__ == '__main__':
     app.run()
@@ -1,7 +1,13 @@
-from sqlalchemy import MetaData, ForeignKeyConstraint, Table
+import unittest
+
+from flask_sqlalchemy import get_debug_queries
+from sqlalchemy import MetaData, ForeignKeyConstraint, Table, event
 from sqlalchemy.engine import reflection
 from sqlalchemy.sql.ddl import DropConstraint, DropTable
 
+from api import create_app, db
+from config import testing_memory_database
+
 
 def assert_payload_field_type_value(obj, payload, field, data_type, value):  # pragma: no cover
     obj.assertIn(field, payload)
@@ -41,3 +47,101 @@ def db_drop_everything(db):   # pragma: no cover
     for table in tbs:
         conn.execute(DropTable(table))
     trans.commit()
+
+
+# databases we've already built the schema in during this test run, each
+# with a connection that stays open until the end of the run, which is what
+# keeps an in-memory database around between tests
+_schemas = {}
+
+
+def _sqlite_connect(dbapi_connection, connection_record):
+    # stop pysqlite from starting and ending transactions by itself, which
+    # breaks SAVEPOINTs; _sqlite_begin() starts them instead
+    dbapi_connection.isolation_level = None
+
+
+def _sqlite_begin(connection):
+    connection.execute('BEGIN')
+
+
+def _memory_connect(dialect, connection_record, cargs, cparams):
+    # the primary database is sqlite:// with TEST_DATABASE=memory; make
+    # that this worker's shared in-memory database, not a private one
+    if cargs == [':memory:']:
+        return testing_memory_database()
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    base class for tests that use the database: the schema is built once
+    per test run rather than once per test, and each test runs inside a
+    transaction that's rolled back afterward, so nothing it writes (or
+    commits) survives it
+
+    the app's code can commit as usual; each commit releases a SAVEPOINT
+    and a new one is started right away
+    """
+    config_name = 'testing'
+
+    def create_app(self):
+        return create_app(self.config_name)
+
+    def setUp(self):
+        self.app = self.create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' \
+                and not event.contains(engine, 'begin', _sqlite_begin):
+            event.listen(engine, 'do_connect', _memory_connect)
+            event.listen(engine, 'connect', _sqlite_connect)
+            event.listen(engine, 'begin', _sqlite_begin)
+        if str(engine.url) not in _schemas:
+            _schemas[str(engine.url)] = engine.connect()
+            db_drop_everything(db)
+            db.create_all()
+
+        self.connection = engine.connect()
+        self.transaction = self.connection.begin()
+        self.session = db.session
+        db.session = db.create_scoped_session(
+            options={'bind': self.connection, 'binds': {}})
+        db.session.begin_nested()
+        db.session.connection()
+        self.db_session = db.session()
+        event.listen(self.db_session, 'after_transaction_end',
+                     self._restart_savepoint)
+
+        self.client = self.app.test_client()
+
+    @staticmethod
+    def _restart_savepoint(session, transaction):
+        if transaction.nested and not transaction._parent.nested:
+            session.expire_all()
+            session.begin_nested()
+            # start the SAVEPOINT now rather than in whatever runs next, so
+            # it isn't counted as one of the next request's queries
+            session.connection()
+
+    @staticmethod
+    def statements():
+        """
+        the SQL run so far in this app context, minus the SAVEPOINTs this
+        class wraps around every commit
+        """
+        return [
+            query.statement for query in get_debug_queries()
+            if not query.statement.startswith(('SAVEPOINT', 'RELEASE'))
+        ]
+
+    def tearDown(self):
+        event.remove(self.db_session, 'after_transaction_end',
+                     self._restart_savepoint)
+        db.session.rollback()
+        db.session.remove()
+        db.session = self.session
+        self.transaction.rollback()
+        self.connection.close()
+        self.app_context.pop()
@@ -0,0 +1,340 @@
+import json
+
+from api import db
+from api.database.bulk import insert_users
+from api.database.models import User
+from tests import DatabaseTestCase, assert_payload_field_type_value, \
+    assert_payload_field_type
+
+
+class BatchCreateUsersTest(DatabaseTestCase):
+    def test_happypath_create_users(self):
+        payload = {'users': [
+            {'username': f' user {index} ', 'email': f' email {index} '}
+            for index in range(3)
+        ]}
+        response = self.client.post(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(201, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, True)
+        assert_payload_field_type(self, data, 'results', list)
+        self.assertEqual(3, len(data['results']))
+
+        for index, result in enumerate(data['results']):
+            assert_payload_field_type_value(
+                self, result, 'success', bool, True
+            )
+            assert_payload_field_type_value(
+                self, result, 'username', str, f'user {index}'
+            )
+            assert_payload_field_type_value(
+                self, result, 'email', str, f'email {index}'
+            )
+            user_id = result['id']
+            assert_payload_field_type_value(
+                self, result['links'], 'get', str, f'/api/v1/users/{user_id}'
+            )
+            self.assertEqual(
+                f'user {index}', db.session.query(User).get(user_id).username
+            )
+
+    def test_happypath_partial_success(self):
+        User(username='taken', email='taken@example.com').insert()
+        payload = {'users': [
+            {'username': 'new user', 'email': 'new@example.com'},
+            {'username': 'taken', 'email': 'other@example.com'},
+            {'username': '', 'email': 'blank@example.com'},
+            {'username': 'twice', 'email': 'twice@example.com'},
+            {'username': 'twice', 'email': 'twice+2@example.com'},
+            'not a user',
+        ]}
+        response = self.client.post(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(207, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, False)
+        results = data['results']
+        self.assertEqual(
+            [True, False, False, True, False, False],
+            [result['success'] for result in results]
+        )
+        assert_payload_field_type_value(
+            self, results[1], 'errors', list,
+            ["'username' parameter must be unique"]
+        )
+        assert_payload_field_type_value(
+            self, results[2], 'errors', list,
+            ["required 'username' parameter is blank"]
+        )
+        assert_payload_field_type_value(
+            self, results[4], 'errors', list,
+            ["'username' parameter must be unique"]
+        )
+        assert_payload_field_type_value(
+            self, results[5], 'errors', list,
+            ['each user must be a JSON object']
+        )
+        self.assertEqual(3, db.session.query(User).count())
+
+    def test_happypath_large_batch_stays_under_the_bind_limit(self):
+        User(username='user 999', email='taken@example.com').insert()
+        queries = len(self.statements())
+        payload = {'users': [
+            {'username': f'user {index}', 'email': f'user{index}@example.com'}
+            for index in range(1000)
+        ]}
+        response = self.client.post(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(207, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(999, sum(
+            result['success'] for result in data['results']))
+        self.assertFalse(data['results'][999]['success'])
+
+        # 499 users' usernames and emails to a uniqueness check, 333 users'
+        # three columns to an INSERT
+        statements = self.statements()[queries:]
+        self.assertEqual(3, len([
+            statement for statement in statements
+            if statement.startswith('SELECT users.username AS')
+        ]))
+        self.assertEqual(3, len([
+            statement for statement in statements
+            if statement.startswith('INSERT')
+        ]))
+
+    def test_sadpath_nothing_created(self):
+        payload = {'users': [{'username': 'no email'}]}
+        response = self.client.post(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data['results'][0], 'errors', list,
+            ["required 'email' parameter is missing"]
+        )
+
+    def test_sadpath_missing_users(self):
+        response = self.client.post(
+            '/api/v1/users/batch', json={},
+            content_type='application/json'
+        )
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list,
+            ["required 'users' parameter is missing"]
+        )
+
+    def test_sadpath_too_many_users(self):
+        self.app.config['USERS_BATCH_MAX_SIZE'] = 1
+        payload = {'users': [
+            {'username': 'user 1', 'email': 'email 1'},
+            {'username': 'user 2', 'email': 'email 2'},
+        ]}
+        response = self.client.post(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list,
+            ["'users' parameter is limited to 1 users"]
+        )
+        self.assertEqual(0, db.session.query(User).count())
+
+
+class BatchPatchUsersTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_1 = User(username='user 1', email='email 1')
+        self.user_1.insert()
+        self.user_2 = User(username='user 2', email='email 2')
+        self.user_2.insert()
+
+    def test_happypath_patch_users(self):
+        payload = {'users': [
+            {'id': self.user_1.id, 'username': ' renamed 1 '},
+            {'id': self.user_2.id, 'email': ' changed 2 '},
+        ]}
+        response = self.client.patch(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, True)
+        results = data['results']
+        assert_payload_field_type_value(
+            self, results[0], 'username', str, 'renamed 1'
+        )
+        assert_payload_field_type_value(
+            self, results[0], 'email', str, 'email 1'
+        )
+        assert_payload_field_type_value(
+            self, results[1], 'username', str, 'user 2'
+        )
+        assert_payload_field_type_value(
+            self, results[1], 'email', str, 'changed 2'
+        )
+
+        response = self.client.get(f'/api/v1/users/{self.user_1.id}')
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'username', str, 'renamed 1'
+        )
+
+    def test_happypath_large_batch_stays_under_the_bind_limit(self):
+        ids = [row.id for row in insert_users([
+            {'username': f'bulk {index}', 'email': f'bulk{index}@example.com'}
+            for index in range(1200)
+        ])]
+        db.session.commit()
+        queries = len(self.statements())
+
+        payload = {'users': [
+            {'id': user_id, 'username': f'renamed {index}',
+             'email': f'renamed{index}@example.com'}
+            for index, user_id in enumerate(ids)
+        ]}
+        response = self.client.patch(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(
+            [f'renamed {index}' for index in range(1200)],
+            [result['username'] for result in data['results']])
+
+        # 199 users to an UPDATE: an id in the IN list, and an id and a
+        # value in each of the two CASEs
+        self.assertEqual(7, len([
+            statement for statement in self.statements()[queries:]
+            if statement.startswith('UPDATE')
+        ]))
+
+    def test_happypath_patch_reports_missing_and_invalid_users(self):
+        payload = {'users': [
+            {'id': self.user_1.id, 'username': 'renamed 1'},
+            {'id': 9999999, 'username': 'nobody'},
+            {'id': self.user_2.id, 'email': ''},
+            {'username': 'no id'},
+        ]}
+        response = self.client.patch(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(207, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        results = data['results']
+        self.assertEqual(
+            [True, False, False, False],
+            [result['success'] for result in results]
+        )
+        assert_payload_field_type_value(self, results[1], 'error', int, 404)
+        assert_payload_field_type_value(
+            self, results[2], 'errors', list,
+            ["required 'email' parameter is blank"]
+        )
+        assert_payload_field_type_value(
+            self, results[3], 'errors', list,
+            ["required 'id' parameter is missing"]
+        )
+
+    def test_sadpath_patch_duplicate_username(self):
+        payload = {'users': [
+            {'id': self.user_1.id, 'username': 'user 2'},
+        ]}
+        response = self.client.patch(
+            '/api/v1/users/batch', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(
+            'user 1', db.session.query(User).get(self.user_1.id).username
+        )
+
+
+class BatchDeleteUsersTest(DatabaseTestCase):
+    def test_happypath_delete_users(self):
+        user_1 = User(username='user 1', email='email 1')
+        user_1.insert()
+        user_2 = User(username='user 2', email='email 2')
+        user_2.insert()
+        user_3 = User(username='user 3', email='email 3')
+        user_3.insert()
+        deleted_ids = [user_1.id, user_3.id]
+
+        response = self.client.delete(
+            '/api/v1/users/batch',
+            json={'ids': [deleted_ids[0], 9999999, deleted_ids[1]]},
+            content_type='application/json'
+        )
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, True)
+        assert_payload_field_type_value(
+            self, data, 'deleted', list, deleted_ids
+        )
+        assert_payload_field_type_value(self, data, 'missing', list, [9999999])
+
+        response = self.client.get('/api/v1/users')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(
+            ['user 2'], [user['username'] for user in data['results']]
+        )
+
+    def test_happypath_large_batch_stays_under_the_bind_limit(self):
+        ids = [row.id for row in insert_users([
+            {'username': f'bulk {index}', 'email': f'bulk{index}@example.com'}
+            for index in range(1200)
+        ])]
+        db.session.commit()
+        queries = len(self.statements())
+
+        response = self.client.delete(
+            '/api/v1/users/batch', json={'ids': ids},
+            content_type='application/json'
+        )
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(ids, data['deleted'])
+
+        # 999 ids to a DELETE
+        self.assertEqual(2, len([
+            statement for statement in self.statements()[queries:]
+            if statement.startswith('DELETE')
+        ]))
+
+    def test_sadpath_delete_bad_ids(self):
+        response = self.client.delete(
+            '/api/v1/users/batch', json={'ids': ['1']},
+            content_type='application/json'
+        )
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list,
+            ["'ids' parameter must be a list of integers"]
+        )
@@ -0,0 +1,102 @@
+import json
+from unittest.mock import patch
+
+from api.database.models import User
+from tests import DatabaseTestCase, assert_payload_field_type_value
+
+
+class CountUsersTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user_1 = User(username='zzz 1', email='e1')
+        self.user_1.insert()
+        User(username='zzz 2', email='e2').insert()
+
+    def _count(self):
+        response = self.client.get('/api/v1/users/count')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, True)
+        self.assertEqual(str(data['count']),
+                         response.headers['X-Total-Count'])
+        return data['count']
+
+    def test_happypath_count_users(self):
+        self.assertEqual(2, self._count())
+
+    def test_happypath_count_is_counted_once(self):
+        self.assertEqual(2, self._count())
+        queries = len(self.statements())
+        self.assertEqual(2, self._count())
+        self.assertEqual(queries, len(self.statements()))
+
+    def test_happypath_writes_keep_the_count(self):
+        self._count()
+        with patch('api.database.models.User.count') as count:
+            response = self.client.post(
+                '/api/v1/users', json={'username': 'new', 'email': 'new'})
+            self.assertEqual(201, response.status_code)
+            self.assertEqual(3, self._count())
+
+            response = self.client.post('/api/v1/users/batch', json={
+                'users': [{'username': 'b1', 'email': 'b1'},
+                          {'username': 'b2', 'email': 'b2'}]
+            })
+            self.assertEqual(201, response.status_code)
+            self.assertEqual(5, self._count())
+
+            response = self.client.delete(f'/api/v1/users/{self.user_1.id}')
+            self.assertEqual(204, response.status_code)
+            self.assertEqual(4, self._count())
+
+            response = self.client.delete(
+                '/api/v1/users/batch', json={'ids': [9999999]})
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(4, self._count())
+
+            User(username='model', email='model').insert()
+            self.assertEqual(5, self._count())
+            count.assert_not_called()
+
+    def test_happypath_count_is_reconciled(self):
+        self.assertEqual(2, self._count())
+        self.app.extensions['counts']['users'].max_age = 0
+        # a write the counter never heard about, from another worker, say
+        User.query.filter_by(username='zzz 2').delete()
+        self.assertEqual(1, self._count())
+
+    def test_happypath_estimate_falls_back_to_count(self):
+        # only Postgres has a planner estimate to offer
+        self.app.config['USERS_COUNT_ESTIMATE'] = True
+        self.assertEqual(2, self._count())
+
+    def test_happypath_collection_total_count(self):
+        self._count()
+        queries = len(self.statements())
+        response = self.client.get('/api/v1/users?limit=1')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('2', response.headers['X-Total-Count'])
+        # served from the kept count, so the page is the only query
+        self.assertEqual(1, len(self.statements()) - queries)
+
+        response = self.client.get(
+            '/api/v1/users?limit=1',
+            headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual('2', response.headers['X-Total-Count'])
+
+    def test_happypath_filtered_total_count_is_opt_in(self):
+        response = self.client.get('/api/v1/users?username=zzz 1')
+        self.assertEqual(200, response.status_code)
+        self.assertNotIn('X-Total-Count', response.headers)
+
+        response = self.client.get('/api/v1/users?username=zzz 1&total=true')
+        self.assertEqual('1', response.headers['X-Total-Count'])
+
+    def test_happypath_stream_total_count(self):
+        response = self.client.get(
+            '/api/v1/users?username_prefix=zzz&stream=ndjson')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('2', response.headers['X-Total-Count'])
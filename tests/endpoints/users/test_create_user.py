@@ -1,19 +1,13 @@
 import json
-import unittest
 from copy import deepcopy
 
-from api import create_app, db
-from tests import db_drop_everything, assert_payload_field_type_value, \
+from tests import DatabaseTestCase, assert_payload_field_type_value, \
     assert_payload_field_type
 
 
-class CreateUserTest(unittest.TestCase):
+class CreateUserTest(DatabaseTestCase):
     def setUp(self):
-        self.app = create_app('testing')
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-        self.client = self.app.test_client()
+        super().setUp()
 
         # adding extra padding in here to ensure we strip() it off later
         self.payload = {
@@ -21,11 +15,6 @@ class CreateUserTest(unittest.TestCase):
             'email': ' new_email ',
         }
 
-    def tearDown(self):
-        db.session.remove()
-        db_drop_everything(db)
-        self.app_context.pop()
-
     def test_happypath_create_user(self):
         payload = deepcopy(self.payload)
 
@@ -129,3 +118,46 @@ class CreateUserTest(unittest.TestCase):
             self, data, 'errors', list,
             ["required 'email' parameter is blank"]
         )
+
+    def test_sadpath_username_too_long(self):
+        payload = deepcopy(self.payload)
+        payload['username'] = 'x' * 81
+        response = self.client.post(
+            '/api/v1/users', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list,
+            ["'username' parameter must be 80 characters or fewer"]
+        )
+
+    def test_sadpath_invalid_json(self):
+        response = self.client.post(
+            '/api/v1/users', data='{"username": ',
+            content_type='application/json'
+        )
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list, ['request body must be valid JSON']
+        )
+
+    def test_sadpath_body_too_large(self):
+        self.app.config['USERS_PAYLOAD_MAX_BYTES'] = 32
+        payload = deepcopy(self.payload)
+        payload['email'] = 'x' * 32
+        response = self.client.post(
+            '/api/v1/users', json=payload,
+            content_type='application/json'
+        )
+        self.assertEqual(413, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'error', int, 413)
+        assert_payload_field_type_value(
+            self, data, 'errors', list, ['request body is too large']
+        )
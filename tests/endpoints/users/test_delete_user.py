@@ -1,28 +1,17 @@
 import json
-import unittest
 from unittest.mock import patch
 
-from api import create_app, db
 from api.database.models import User
-from tests import db_drop_everything, assert_payload_field_type_value
+from tests import DatabaseTestCase, assert_payload_field_type_value
 
 
-class DeleteUserTest(unittest.TestCase):
+class DeleteUserTest(DatabaseTestCase):
     def setUp(self):
-        self.app = create_app('testing')
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-        self.client = self.app.test_client()
+        super().setUp()
 
         self.user_1 = User(username='zzz 1', email='e1')
         self.user_1.insert()
 
-    def tearDown(self):
-        db.session.remove()
-        db_drop_everything(db)
-        self.app_context.pop()
-
 
     def test_happypath_delete_a_user(self):
         response = self.client.delete(
@@ -49,3 +38,14 @@ class DeleteUserTest(unittest.TestCase):
         assert_payload_field_type_value(
             self, data, 'message', str, 'resource not found'
         )
+
+    def test_happypath_delete_is_a_single_query(self):
+        user_id = self.user_1.id
+        queries = len(self.statements())
+
+        response = self.client.delete(f'/api/v1/users/{user_id}')
+        self.assertEqual(204, response.status_code)
+
+        statements = self.statements()
+        self.assertEqual(1, len(statements) - queries)
+        self.assertTrue(statements[-1].startswith('DELETE'))
@@ -1,27 +1,12 @@
 import json
-import unittest
 
-from api import create_app, db
+from api import db
 from api.database.models import User
-from tests import db_drop_everything, assert_payload_field_type_value, \
+from tests import DatabaseTestCase, assert_payload_field_type_value, \
     assert_payload_field_type
 
 
-class GetUsersTest(unittest.TestCase):
-    def setUp(self):
-        self.app = create_app('testing')
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-        self.client = self.app.test_client()
-
-    def tearDown(self):
-        db.session.remove()
-        db_drop_everything(db)
-        self.app_context.pop()
-
-
-class GetAllUsersTest(GetUsersTest):
+class GetAllUsersTest(DatabaseTestCase):
     def test_happypath_get_all_users(self):
         user_1 = User(username='zzz 1', email='email 1')
         user_1.insert()
@@ -90,3 +75,368 @@ class GetAllUsersTest(GetUsersTest):
         assert_payload_field_type(self, data, 'results', list)
         # results list should be empty
         self.assertEqual(0, len(data['results']))
+
+
+class GetUsersPaginationTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            User(username=f'user {index}', email=f'email {index}').insert()
+
+    def test_happypath_paginate_forward_and_back(self):
+        response = self.client.get('/api/v1/users?limit=2')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(
+            ['user 0', 'user 1'],
+            [user['username'] for user in data['results']]
+        )
+        links = data['links']
+        assert_payload_field_type_value(
+            self, links, 'index', str, '/api/v1/users'
+        )
+        self.assertIsNone(links['prev'])
+        assert_payload_field_type(self, links, 'next', str)
+
+        response = self.client.get(links['next'])
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(
+            ['user 2', 'user 3'],
+            [user['username'] for user in data['results']]
+        )
+
+        response = self.client.get(data['links']['next'])
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(
+            ['user 4'],
+            [user['username'] for user in data['results']]
+        )
+        self.assertIsNone(data['links']['next'])
+
+        response = self.client.get(data['links']['prev'])
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(
+            ['user 2', 'user 3'],
+            [user['username'] for user in data['results']]
+        )
+        assert_payload_field_type(self, data['links'], 'prev', str)
+
+    def test_happypath_limit_is_capped(self):
+        self.app.config['USERS_MAX_PAGE_SIZE'] = 3
+        response = self.client.get('/api/v1/users?limit=1000')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(3, len(data['results']))
+
+    def test_sadpath_bad_limit(self):
+        response = self.client.get('/api/v1/users?limit=zero')
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, False)
+        assert_payload_field_type_value(
+            self, data, 'errors', list,
+            ["'limit' parameter must be a positive integer"]
+        )
+
+    def test_sadpath_bad_cursor(self):
+        response = self.client.get('/api/v1/users?cursor=not-a-cursor')
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list, ["'cursor' parameter is invalid"]
+        )
+
+
+class StreamUsersTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # a small batch size makes sure we exercise more than one chunk
+        self.app.config['USERS_STREAM_BATCH_SIZE'] = 2
+        for index in range(5):
+            User(username=f'user {index}', email=f'email {index}').insert()
+
+    def test_happypath_stream_ndjson(self):
+        response = self.client.get(
+            '/api/v1/users', headers={'Accept': 'application/x-ndjson'}
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/x-ndjson', response.mimetype)
+
+        lines = response.data.decode('utf-8').splitlines()
+        self.assertEqual(5, len(lines))
+        results = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [f'user {index}' for index in range(5)],
+            [user['username'] for user in results]
+        )
+        assert_payload_field_type(self, results[0], 'links', dict)
+
+    def test_happypath_stream_json(self):
+        response = self.client.get('/api/v1/users?stream=1')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/json', response.mimetype)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, True)
+        self.assertEqual(
+            [f'user {index}' for index in range(5)],
+            [user['username'] for user in data['results']]
+        )
+
+    def test_happypath_stream_empty(self):
+        User.query.delete()
+        db.session.commit()
+
+        response = self.client.get('/api/v1/users?stream=1')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(0, len(data['results']))
+
+        response = self.client.get('/api/v1/users?stream=ndjson')
+        self.assertEqual('', response.data.decode('utf-8'))
+
+
+class ConditionalGetUsersTest(DatabaseTestCase):
+    def test_happypath_conditional_get_users(self):
+        user_1 = User(username='zzz 1', email='email 1')
+        user_1.insert()
+
+        response = self.client.get('/api/v1/users')
+        etag = response.headers['ETag']
+        self.assertNotIn('Last-Modified', response.headers)
+
+        response = self.client.get(
+            '/api/v1/users', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.data)
+
+        # a different page is a different representation
+        response = self.client.get(
+            '/api/v1/users?limit=1', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(200, response.status_code)
+
+        # and so is the same page after the table changes
+        User(username='aaa 1', email='email 2').insert()
+        response = self.client.get(
+            '/api/v1/users', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, len(json.loads(response.data)['results']))
+
+    def test_happypath_page_etag_follows_the_page(self):
+        User(username='aaa 1', email='email 1').insert()
+        user_2 = User(username='bbb 1', email='email 2')
+        user_2.insert()
+        User(username='ccc 1', email='email 3').insert()
+
+        queries = len(self.statements())
+        response = self.client.get('/api/v1/users?limit=1')
+        etag = response.headers['ETag']
+        # the ETag comes from the page itself, not an aggregate over the table
+        self.assertFalse(any('max(' in statement for statement
+                             in self.statements()[queries:]))
+
+        # a change past the end of the page doesn't touch it...
+        user_2.email = 'email 2b'
+        user_2.update()
+        response = self.client.get(
+            '/api/v1/users?limit=1', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+
+        # ...but a change to a row on it does
+        response = self.client.get(
+            '/api/v1/users?limit=2', headers={'If-None-Match': etag}
+        )
+        etag = response.headers['ETag']
+        user_2.email = 'email 2c'
+        user_2.update()
+        response = self.client.get(
+            '/api/v1/users?limit=2', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(200, response.status_code)
+
+    def test_happypath_conditional_get_stream(self):
+        User(username='zzz 1', email='email 1').insert()
+        response = self.client.get('/api/v1/users?stream=ndjson')
+        etag = response.headers['ETag']
+
+        response = self.client.get(
+            '/api/v1/users?stream=ndjson', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+
+        User(username='aaa 1', email='email 2').insert()
+        response = self.client.get(
+            '/api/v1/users?stream=ndjson', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(200, response.status_code)
+
+    def test_happypath_deletes_are_not_modified_since(self):
+        User(username='aaa 1', email='email 1').insert()
+        user_2 = User(username='bbb 1', email='email 2')
+        user_2.insert()
+        # a date after both users were written
+        since = 'Fri, 01 Jan 2100 00:00:00 GMT'
+
+        for path in ('/api/v1/users', '/api/v1/users?stream=ndjson'):
+            response = self.client.get(path)
+            self.assertNotIn('Last-Modified', response.headers)
+
+        response = self.client.delete(f'/api/v1/users/{user_2.id}')
+        self.assertEqual(204, response.status_code)
+
+        # deleting a user doesn't make anything newer, so If-Modified-Since
+        # on a collection would have missed it; it's ignored there
+        for path in ('/api/v1/users', '/api/v1/users?stream=ndjson'):
+            response = self.client.get(
+                path, headers={'If-Modified-Since': since})
+            self.assertEqual(200, response.status_code)
+
+    def test_happypath_conditional_get_empty_users(self):
+        response = self.client.get('/api/v1/users')
+        self.assertNotIn('Last-Modified', response.headers)
+
+        etag = response.headers['ETag']
+        response = self.client.get(
+            '/api/v1/users', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+
+
+class SparseGetUsersTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        User(username='user 1', email='email 1').insert()
+
+    def test_happypath_sparse_fieldset(self):
+        response = self.client.get('/api/v1/users?fields=id,username')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(['id', 'username'], sorted(data['results'][0]))
+        # the collection's own paging links are still there
+        assert_payload_field_type(self, data, 'links', dict)
+
+    def test_happypath_without_links(self):
+        response = self.client.get('/api/v1/users?links=false&stream=1')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(
+            ['email', 'id', 'username'], sorted(data['results'][0])
+        )
+
+    def test_sadpath_unknown_field(self):
+        response = self.client.get('/api/v1/users?fields=id,password')
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list,
+            ["'fields' parameter can only include id, username, email, links"]
+        )
+
+
+class FilterUsersTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        User(username='ann', email='ann@example.com').insert()
+        User(username='annie', email='annie@Example.org').insert()
+        User(username='Anna', email='anna@example.com').insert()
+        User(username='an_dy', email='andy@sample.com').insert()
+        User(username='bob', email='bob@example.com').insert()
+
+    def _usernames(self, query):
+        response = self.client.get(f'/api/v1/users?{query}')
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode('utf-8'))
+        return [user['username'] for user in data['results']]
+
+    def test_happypath_username_prefix(self):
+        # case sensitive, the same as Postgres
+        self.assertEqual(['an_dy', 'ann', 'annie'],
+                         self._usernames('username_prefix=an'))
+        self.assertEqual(['Anna'], self._usernames('username_prefix=An'))
+
+    def test_happypath_prefix_wildcards_are_literal(self):
+        self.assertEqual(['an_dy'], self._usernames('username_prefix=an_'))
+        self.assertEqual([], self._usernames('username_prefix=%25'))
+
+    def test_happypath_email_domain(self):
+        self.assertEqual(['Anna', 'ann', 'bob'],
+                         sorted(self._usernames('email_domain=example.com')))
+        # domains aren't case sensitive, and a leading @ is fine
+        self.assertEqual(['annie'],
+                         self._usernames('email_domain=@example.ORG'))
+
+    def test_happypath_exact_matches(self):
+        self.assertEqual(['ann'], self._usernames('username=ann'))
+        self.assertEqual(['bob'], self._usernames('email=bob@example.com'))
+        self.assertEqual([], self._usernames('username=an'))
+
+    def test_happypath_filters_combine(self):
+        self.assertEqual(
+            ['ann'],
+            self._usernames('username_prefix=an&email_domain=example.com')
+        )
+
+    def test_happypath_filters_are_kept_in_page_links(self):
+        response = self.client.get(
+            '/api/v1/users?username_prefix=an&limit=2')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(['an_dy', 'ann'],
+                         [user['username'] for user in data['results']])
+
+        response = self.client.get(data['links']['next'])
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(['annie'],
+                         [user['username'] for user in data['results']])
+        self.assertIsNone(data['links']['next'])
+
+    def test_happypath_stream_filtered(self):
+        response = self.client.get(
+            '/api/v1/users?stream=ndjson&email_domain=sample.com')
+        self.assertEqual(200, response.status_code)
+        lines = response.data.decode('utf-8').splitlines()
+        self.assertEqual(['an_dy'],
+                         [json.loads(line)['username'] for line in lines])
+
+    def test_happypath_etag_follows_the_filtered_rows(self):
+        response = self.client.get('/api/v1/users?username_prefix=b')
+        etag = response.headers['ETag']
+
+        # a change outside the filter doesn't touch this representation
+        user = User.query.filter_by(username='ann').one()
+        user.email = 'ann@elsewhere.com'
+        user.update()
+        response = self.client.get(
+            '/api/v1/users?username_prefix=b',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+
+        User(username='bea', email='bea@example.com').insert()
+        response = self.client.get(
+            '/api/v1/users?username_prefix=b',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(200, response.status_code)
+
+    def test_sadpath_blank_filters(self):
+        response = self.client.get(
+            '/api/v1/users?username_prefix=%20&email_domain=@')
+        self.assertEqual(400, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'errors', list, [
+                "'username_prefix' parameter must not be blank",
+                "'email_domain' parameter must not be blank",
+            ]
+        )
@@ -1,29 +1,18 @@
 import json
-import unittest
 from unittest.mock import patch
 
-from api import create_app, db
 from api.database.models import User
-from tests import db_drop_everything, assert_payload_field_type_value, \
+from tests import DatabaseTestCase, assert_payload_field_type_value, \
     assert_payload_field_type
 
 
-class GetUserTest(unittest.TestCase):
+class GetUserTest(DatabaseTestCase):
     def setUp(self):
-        self.app = create_app('testing')
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-        self.client = self.app.test_client()
+        super().setUp()
 
         self.user_1 = User(username='zzz 1', email='e1')
         self.user_1.insert()
 
-    def tearDown(self):
-        db.session.remove()
-        db_drop_everything(db)
-        self.app_context.pop()
-
     def test_happypath_get_a_user(self):
         response = self.client.get(
             f'/api/v1/users/{self.user_1.id}'
@@ -68,3 +57,89 @@ class GetUserTest(unittest.TestCase):
         assert_payload_field_type_value(
             self, data, 'message', str, 'resource not found'
         )
+
+    def test_happypath_get_a_user_is_cached(self):
+        self.client.get(f'/api/v1/users/{self.user_1.id}')
+
+        with patch('api.resources.users.db.session.query') as query:
+            response = self.client.get(f'/api/v1/users/{self.user_1.id}')
+            query.assert_not_called()
+        self.assertEqual(200, response.status_code)
+
+    def test_happypath_patch_invalidates_cached_user(self):
+        self.client.get(f'/api/v1/users/{self.user_1.id}')
+        self.client.patch(
+            f'/api/v1/users/{self.user_1.id}',
+            json={'username': 'changed', 'email': 'changed'},
+            content_type='application/json'
+        )
+
+        response = self.client.get(f'/api/v1/users/{self.user_1.id}')
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'username', str, 'changed'
+        )
+
+    def test_happypath_delete_invalidates_cached_user(self):
+        self.client.get(f'/api/v1/users/{self.user_1.id}')
+        self.client.delete(f'/api/v1/users/{self.user_1.id}')
+
+        response = self.client.get(f'/api/v1/users/{self.user_1.id}')
+        self.assertEqual(404, response.status_code)
+
+    def test_happypath_conditional_get_a_user(self):
+        response = self.client.get(f'/api/v1/users/{self.user_1.id}')
+        etag = response.headers['ETag']
+        self.assertIn('Last-Modified', response.headers)
+
+        response = self.client.get(
+            f'/api/v1/users/{self.user_1.id}',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.data)
+        self.assertEqual(etag, response.headers['ETag'])
+
+        self.client.patch(
+            f'/api/v1/users/{self.user_1.id}',
+            json={'username': 'changed', 'email': 'changed'},
+            content_type='application/json'
+        )
+        response = self.client.get(
+            f'/api/v1/users/{self.user_1.id}',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+    def test_happypath_if_modified_since_a_user(self):
+        response = self.client.get(f'/api/v1/users/{self.user_1.id}')
+
+        response = self.client.get(
+            f'/api/v1/users/{self.user_1.id}',
+            headers={'If-Modified-Since': response.headers['Last-Modified']}
+        )
+        self.assertEqual(304, response.status_code)
+
+    def test_endpoint_sadpath_non_numeric_id(self):
+        response = self.client.get('/api/v1/users/abc')
+        self.assertEqual(404, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(
+            self, data, 'message', str, 'resource not found'
+        )
+
+    def test_happypath_get_a_user_sparse_fieldset(self):
+        response = self.client.get(f'/api/v1/users/{self.user_1.id}')
+        etag = response.headers['ETag']
+
+        response = self.client.get(
+            f'/api/v1/users/{self.user_1.id}?fields=username&links=false',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers['ETag'])
+
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual({'username': 'zzz 1', 'success': True}, data)
@@ -0,0 +1,93 @@
+import json
+from unittest.mock import patch
+
+from api.database.models import User
+from tests import DatabaseTestCase, assert_payload_field_type_value
+
+
+class LookupUserTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user_1 = User(username='ian', email='ian@example.com')
+        self.user_1.insert()
+
+    def test_happypath_get_a_user_by_username(self):
+        response = self.client.get('/api/v1/users/by-username/ian')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, True)
+        assert_payload_field_type_value(self, data, 'id', int, self.user_1.id)
+        assert_payload_field_type_value(
+            self, data['links'], 'get', str, f'/api/v1/users/{self.user_1.id}'
+        )
+
+    def test_happypath_get_a_user_by_email(self):
+        response = self.client.get(
+            '/api/v1/users/by-email/ian@example.com?fields=id,username')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(['id', 'success', 'username'], sorted(data))
+
+    def test_happypath_lookup_is_one_query_then_cached(self):
+        queries = len(self.statements())
+        response = self.client.get('/api/v1/users/by-username/ian')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(self.statements()) - queries)
+
+        with patch('api.resources.users.db.session.query') as query:
+            response = self.client.get('/api/v1/users/by-username/ian')
+            # the same entry serves lookups by id, too
+            self.client.get(f'/api/v1/users/{self.user_1.id}')
+            query.assert_not_called()
+        self.assertEqual(200, response.status_code)
+
+    def test_happypath_conditional_lookup(self):
+        response = self.client.get('/api/v1/users/by-username/ian')
+        etag = response.headers['ETag']
+        # the same representation as GET /api/v1/users/<id>
+        response = self.client.get(
+            f'/api/v1/users/{self.user_1.id}',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+
+        response = self.client.get(
+            '/api/v1/users/by-username/ian', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(304, response.status_code)
+
+    def test_happypath_rename_is_not_served_from_a_stale_alias(self):
+        user_id = self.user_1.id
+        self.client.get('/api/v1/users/by-username/ian')
+        self.client.patch(f'/api/v1/users/{user_id}',
+                          json={'username': 'douglas'})
+        User(username='ian', email='other@example.com').insert()
+
+        response = self.client.get('/api/v1/users/by-username/ian')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual('other@example.com', data['email'])
+
+        response = self.client.get('/api/v1/users/by-username/douglas')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(user_id, data['id'])
+
+    def test_sadpath_unknown_username(self):
+        response = self.client.get('/api/v1/users/by-username/nobody')
+        self.assertEqual(404, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, False)
+        assert_payload_field_type_value(
+            self, data, 'message', str, 'resource not found'
+        )
+
+    def test_sadpath_deleted_user(self):
+        user_id = self.user_1.id
+        self.client.get('/api/v1/users/by-email/ian@example.com')
+        self.client.delete(f'/api/v1/users/{user_id}')
+
+        response = self.client.get('/api/v1/users/by-email/ian@example.com')
+        self.assertEqual(404, response.status_code)
@@ -1,21 +1,15 @@
 import json
-import unittest
 from copy import deepcopy
 from unittest.mock import patch
 
-from api import create_app, db
 from api.database.models import User
-from tests import db_drop_everything, assert_payload_field_type_value, \
+from tests import DatabaseTestCase, assert_payload_field_type_value, \
     assert_payload_field_type
 
 
-class PatchuserTest(unittest.TestCase):
+class PatchuserTest(DatabaseTestCase):
     def setUp(self):
-        self.app = create_app('testing')
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-        self.client = self.app.test_client()
+        super().setUp()
 
         self.user_1 = User(username='zzz 1', email='e1')
         self.user_1.insert()
@@ -26,11 +20,6 @@ class PatchuserTest(unittest.TestCase):
             'email': ' new_email ',
         }
 
-    def tearDown(self):
-        db.session.remove()
-        db_drop_everything(db)
-        self.app_context.pop()
-
     def test_happypath_patch_a_user(self):
         payload = deepcopy(self.payload)
 
@@ -116,3 +105,33 @@ class PatchuserTest(unittest.TestCase):
         assert_payload_field_type_value(
             self, data, 'message', str, 'resource not found'
         )
+
+    def test_happypath_patch_one_field(self):
+        response = self.client.patch(
+            f'/api/v1/users/{self.user_1.id}',
+            json={'email': ' new_email '},
+            content_type='application/json'
+        )
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'username', str, 'zzz 1')
+        assert_payload_field_type_value(
+            self, data, 'email', str, 'new_email'
+        )
+
+    def test_happypath_patch_skips_the_select(self):
+        user_id = self.user_1.id
+        queries = len(self.statements())
+
+        response = self.client.patch(
+            f'/api/v1/users/{user_id}',
+            json=self.payload,
+            content_type='application/json'
+        )
+        self.assertEqual(200, response.status_code)
+
+        # the UPDATE comes first; only dialects without RETURNING need to
+        # read the row back afterwards
+        statements = self.statements()
+        self.assertTrue(statements[queries].startswith('UPDATE'))
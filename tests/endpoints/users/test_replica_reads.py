@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from api import create_app, db
+from api.database.models import User
+from config import TestingConfig
+from tests import DatabaseTestCase
+
+
+def _replica_url(n):
+    # a process of its own per pytest-xdist worker, so the pid will do
+    return 'sqlite:///' + os.path.join(
+        tempfile.gettempdir(), f'test-replica-{n}-{os.getpid()}.db')
+
+
+class ReplicaConfig(TestingConfig):
+    # two SQLite files standing in for read replicas
+    SQLALCHEMY_BINDS = {'replica_1': _replica_url(1),
+                        'replica_2': _replica_url(2)}
+    DATABASE_REPLICAS = ['replica_1', 'replica_2']
+
+
+class ReplicaReadsTest(DatabaseTestCase):
+    def create_app(self):
+        with patch.dict('config.config', {'replicas': ReplicaConfig}):
+            return create_app('replicas')
+
+    def setUp(self):
+        super().setUp()
+
+        # the same user, by a different name on each replica, so we can tell
+        # which one answered
+        for bind in ReplicaConfig.DATABASE_REPLICAS:
+            engine = db.get_engine(self.app, bind=bind)
+            User.__table__.create(engine, checkfirst=True)
+            engine.execute(User.__table__.delete())
+            engine.execute(User.__table__.insert().values(
+                id=1, username=bind, email=f'{bind}@example.com'))
+
+        User(username='primary', email='primary@example.com',
+             user_id=1).insert()
+
+    @classmethod
+    def tearDownClass(cls):
+        for n in (1, 2):
+            path = _replica_url(n)[len('sqlite:///'):]
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _usernames(self, client=None):
+        response = (client or self.client).get('/api/v1/users')
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode('utf-8'))
+        return [user['username'] for user in data['results']]
+
+    def test_happypath_reads_take_turns_on_the_replicas(self):
+        first, second, third = (self._usernames() for _ in range(3))
+        self.assertEqual(
+            {'replica_1', 'replica_2'}, {first[0], second[0]})
+        self.assertEqual(first, third)
+
+    def test_happypath_get_one_user_reads_a_replica(self):
+        response = self.client.get('/api/v1/users/1')
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertIn(data['username'], ReplicaConfig.DATABASE_REPLICAS)
+
+    def test_happypath_streams_read_a_replica(self):
+        response = self.client.get('/api/v1/users?stream=ndjson')
+        self.assertEqual(200, response.status_code)
+        users = [json.loads(line) for line in
+                 response.data.decode('utf-8').splitlines()]
+        self.assertIn(users[0]['username'], ReplicaConfig.DATABASE_REPLICAS)
+
+    def test_happypath_writes_go_to_the_primary(self):
+        response = self.client.post('/api/v1/users', json={
+            'username': 'new', 'email': 'new@example.com'})
+        self.assertEqual(201, response.status_code)
+        self.assertIn('db_primary=1', response.headers['Set-Cookie'])
+        self.assertIn('Max-Age=5', response.headers['Set-Cookie'])
+
+        # this client reads its own write from the primary...
+        self.assertEqual(['new', 'primary'], self._usernames())
+        self.assertEqual(['new', 'primary'], self._usernames())
+
+        # ...everyone else still reads from the replicas
+        other_client = self.app.test_client()
+        self.assertEqual(1, len(self._usernames(other_client)))
+
+    def test_happypath_failed_writes_dont_stick(self):
+        response = self.client.post('/api/v1/users', json={})
+        self.assertEqual(400, response.status_code)
+        self.assertNotIn('Set-Cookie', response.headers)
+
+    def test_happypath_replica_reads_are_cached_briefly(self):
+        with patch('api.resources.users.cache.set') as cache_set:
+            response = self.client.get('/api/v1/users/1')
+            self.assertEqual(200, response.status_code)
+        cache_set.assert_called_once()
+        self.assertEqual(5, cache_set.call_args[0][2])
+
+    def test_happypath_recent_writers_skip_the_cache(self):
+        response = self.client.patch(
+            '/api/v1/users/1', json={'email': 'changed@example.com'})
+        self.assertEqual(200, response.status_code)
+
+        # someone else puts what a replica says in the cache...
+        other_client = self.app.test_client()
+        response = other_client.get('/api/v1/users/1')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertNotEqual('changed@example.com', data['email'])
+
+        # ...but the client that wrote reads from the primary
+        response = self.client.get('/api/v1/users/1')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual('changed@example.com', data['email'])
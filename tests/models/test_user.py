@@ -1,23 +1,10 @@
-import unittest
 from sqlalchemy.exc import IntegrityError
 
-from api import create_app, db
 from api.database.models import User
+from tests import DatabaseTestCase
 
 
-class AppTest(unittest.TestCase):
-    def setUp(self):
-        self.app = create_app('testing')
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-        self.client = self.app.test_client()
-
-    def tearDown(self):
-        db.session.remove()
-        db.drop_all()
-        self.app_context.pop()
-
+class AppTest(DatabaseTestCase):
     def test_user_model(self):
         user = User(username='ian', email='ian.douglas@iandouglas.com')
         user.insert()
@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class EndpointsBenchmarkTest(unittest.TestCase):
+    def test_smoke(self):
+        # in a process of its own, against a SQLite file of its own: it drops
+        # and creates the users table, which the other tests are using
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            environ = dict(os.environ)
+            environ.pop('TEST_DATABASE', None)
+            environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(
+                directory, 'bench.db')
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.endpoints',
+                 '--rows', '10', '--requests', '1', '--write-requests', '1',
+                 '--stream-requests', '1', '--alloc-requests', '1',
+                 '--clients', 'test_client', '--output', output],
+                cwd=ROOT, env=environ, check=True, stdout=subprocess.DEVNULL)
+            with open(output) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual('sqlite', report['database'])
+        self.assertEqual(10, report['rows'])
+        self.assertTrue(report['results'])
+        for result in report['results']:
+            self.assertEqual(0, result['errors'], result)
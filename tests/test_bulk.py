@@ -0,0 +1,53 @@
+import unittest
+
+from sqlalchemy import func
+
+from api import db
+from api.database.bulk import MAX_BIND_PARAMETERS, _copy_text, chunked, \
+    copy_users, insert_users
+from api.database.models import User
+from tests import DatabaseTestCase
+
+
+class CopyUsersTest(DatabaseTestCase):
+    def test_copy_users(self):
+        copy_users([
+            {'username': f'user{n}', 'email': f'user{n}@example.com'}
+            for n in range(25)
+        ])
+        db.session.commit()
+
+        self.assertEqual(25, db.session.query(func.count(User.id)).scalar())
+        user = User.query.filter_by(username='user7').one()
+        self.assertEqual('user7@example.com', user.email)
+        self.assertIsNotNone(user.updated_at)
+
+    def test_insert_users_counts_defaults_as_parameters(self):
+        queries = len(self.statements())
+        # updated_at isn't in the rows, but its default is bound for each
+        insert_users([
+            {'username': f'user{n}', 'email': f'user{n}@example.com'}
+            for n in range(1000)
+        ])
+        self.assertEqual(4, len([
+            statement for statement in self.statements()[queries:]
+            if statement.startswith('INSERT')
+        ]))
+
+    def test_copy_no_users(self):
+        copy_users([])
+        self.assertEqual(0, db.session.query(func.count(User.id)).scalar())
+
+    def test_copy_text_escapes_special_characters(self):
+        self.assertEqual('a\\tb\\nc\\\\d\\r', _copy_text('a\tb\nc\\d\r'))
+
+
+class ChunkedTest(unittest.TestCase):
+    def test_chunks_stay_under_the_bind_limit(self):
+        chunks = chunked(list(range(1000)), 3)
+        self.assertEqual([333, 333, 333, 1], [len(chunk) for chunk in chunks])
+        self.assertEqual(list(range(1000)), sum(chunks, []))
+        self.assertEqual(
+            [MAX_BIND_PARAMETERS, 1],
+            [len(chunk) for chunk in chunked(list(range(1000)))])
+        self.assertEqual([], chunked([], 3))
@@ -0,0 +1,94 @@
+import sys
+import unittest
+from unittest import mock
+
+from api.cache import LocalCache, LocalRedis, NullCache, SharedCache, \
+    make_backend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LocalCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LocalCache(ttl=10, max_entries=2, clock=self.clock)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', {'id': 1})
+        self.assertEqual({'id': 1}, self.cache.get('a'))
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.clock.now = 9
+        self.assertEqual(1, self.cache.get('a'))
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        # touching 'a' makes 'b' the least recently used entry
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertEqual(1, self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(3, self.cache.get('c'))
+
+    def test_delete(self):
+        self.cache.set('a', 1)
+        self.cache.delete('a')
+        self.cache.delete('missing')
+        self.assertIsNone(self.cache.get('a'))
+
+
+class SharedCacheTest(unittest.TestCase):
+    def test_round_trips_through_the_local_stand_in(self):
+        cache = SharedCache(LocalRedis(), ttl=10)
+        payload = {'id': 1, 'links': {'index': '/api/v1/users'}}
+        cache.set('user:1', payload)
+
+        cached = cache.get('user:1')
+        self.assertEqual(payload, cached)
+        # values are serialized, so callers never share the stored object
+        self.assertIsNot(payload, cached)
+
+        cache.delete('user:1')
+        self.assertIsNone(cache.get('user:1'))
+
+    def test_make_backend(self):
+        config = {
+            'CACHE_BACKEND': 'shared',
+            'CACHE_TTL': 5,
+            'CACHE_MAX_ENTRIES': 10,
+            'CACHE_REDIS_URL': None,
+        }
+        self.assertIsInstance(make_backend(config), SharedCache)
+
+        config['CACHE_BACKEND'] = 'null'
+        self.assertIsInstance(make_backend(config), NullCache)
+
+        config['CACHE_BACKEND'] = 'local'
+        self.assertIsInstance(make_backend(config), LocalCache)
+
+        config['CACHE_BACKEND'] = 'bogus'
+        with self.assertRaises(ValueError):
+            make_backend(config)
+
+    def test_make_backend_needs_redis_for_a_url(self):
+        config = {
+            'CACHE_BACKEND': 'shared',
+            'CACHE_TTL': 5,
+            'CACHE_MAX_ENTRIES': 10,
+            'CACHE_REDIS_URL': 'redis://localhost:6379/0',
+        }
+        with mock.patch.dict(sys.modules, {'redis': None}):
+            with self.assertRaises(ImportError):
+                make_backend(config)
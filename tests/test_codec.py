@@ -0,0 +1,53 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from api import create_app
+from api.codec import OrjsonBackend, StdlibBackend, make_backend, orjson, \
+    output_json
+
+# orjson is an optional install, so the backends we can test depend on it
+BACKENDS = [StdlibBackend] + ([OrjsonBackend] if orjson else [])
+
+
+class CodecTest(unittest.TestCase):
+    def test_backends_round_trip(self):
+        payload = {'id': 1, 'username': 'café', 'links': {'index': '/'}}
+        for backend in (backend() for backend in BACKENDS):
+            encoded = backend.dumps(payload)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(payload, json.loads(encoded))
+            self.assertEqual(payload, backend.loads(encoded))
+            self.assertEqual(payload, backend.loads(encoded.decode('utf-8')))
+
+    def test_make_backend(self):
+        self.assertIsInstance(make_backend('auto'), BACKENDS[-1])
+        self.assertIsInstance(make_backend('stdlib'), StdlibBackend)
+        with self.assertRaises(ValueError):
+            make_backend('bogus')
+
+    def test_auto_falls_back_to_stdlib(self):
+        with patch('api.codec.orjson', None):
+            self.assertIsInstance(make_backend('auto'), StdlibBackend)
+            with self.assertRaises(ImportError):
+                make_backend('orjson')
+
+    def test_output_json_uses_the_app_backend(self):
+        app = create_app('testing')
+        with app.app_context():
+            response = output_json({'id': 1}, 201, {'X-Test': 'yes'})
+            self.assertEqual(BACKENDS[-1]().dumps({'id': 1}) + b'\n',
+                             response.data)
+            self.assertEqual(201, response.status_code)
+            self.assertEqual('yes', response.headers['X-Test'])
+
+            app.extensions['json_codec'] = StdlibBackend()
+            response = output_json({'id': 1}, 200)
+            self.assertEqual(b'{"id": 1}\n', response.data)
+
+    @unittest.skipIf(orjson is None, "orjson isn't installed")
+    def test_orjson_output_is_compact(self):
+        app = create_app('testing')
+        with app.app_context():
+            response = output_json({'id': 1}, 200)
+            self.assertEqual(b'{"id":1}\n', response.data)
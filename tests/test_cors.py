@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+
+from api import create_app
+from api.resources.users import UsersResource
+from config import TestingConfig, cors_origins
+from tests import DatabaseTestCase
+
+PREFLIGHT = {
+    'Origin': 'https://app.example.com',
+    'Access-Control-Request-Method': 'PATCH',
+    'Access-Control-Request-Headers': 'Content-Type',
+}
+
+
+class CorsTest(DatabaseTestCase):
+    def test_headers_are_not_duplicated(self):
+        response = self.client.get('/api/v1/users',
+                                   headers={'Origin': 'https://a.example'})
+        self.assertEqual(200, response.status_code)
+        for header in ('Access-Control-Allow-Origin',
+                       'Access-Control-Allow-Headers',
+                       'Access-Control-Allow-Methods'):
+            self.assertEqual(1, len(response.headers.getlist(header)))
+        self.assertEqual('*', response.headers['Access-Control-Allow-Origin'])
+
+    def test_preflight_skips_flask(self):
+        with patch.object(UsersResource, 'dispatch_request') as dispatch:
+            response = self.client.options('/api/v1/users',
+                                           headers=PREFLIGHT)
+            dispatch.assert_not_called()
+
+        self.assertEqual(204, response.status_code)
+        self.assertEqual(b'', response.data)
+        self.assertEqual('*', response.headers['Access-Control-Allow-Origin'])
+        self.assertEqual('86400', response.headers['Access-Control-Max-Age'])
+        self.assertEqual('GET, PATCH, POST, DELETE, OPTIONS',
+                         response.headers['Access-Control-Allow-Methods'])
+
+    def test_plain_options_still_reaches_flask(self):
+        response = self.client.options('/api/v1/users')
+        self.assertEqual(200, response.status_code)
+        self.assertIn('POST', response.headers['Allow'])
+
+
+class RestrictedOriginsConfig(TestingConfig):
+    CORS_ORIGINS = ['https://app.example.com']
+    CORS_MAX_AGE = 600
+
+
+class RestrictedCorsTest(DatabaseTestCase):
+    def create_app(self):
+        with patch.dict('config.config',
+                        {'restricted': RestrictedOriginsConfig}):
+            return create_app('restricted')
+
+    def test_allowed_origin_is_echoed(self):
+        response = self.client.get(
+            '/api/v1/users', headers={'Origin': 'https://app.example.com'})
+        self.assertEqual('https://app.example.com',
+                         response.headers['Access-Control-Allow-Origin'])
+        self.assertEqual('Origin', response.headers['Vary'])
+
+        response = self.client.options('/api/v1/users', headers=PREFLIGHT)
+        self.assertEqual(204, response.status_code)
+        self.assertEqual('600', response.headers['Access-Control-Max-Age'])
+
+    def test_other_origins_get_no_cors_headers(self):
+        headers = dict(PREFLIGHT, Origin='https://evil.example.com')
+        for response in (
+                self.client.get('/api/v1/users', headers=headers),
+                self.client.options('/api/v1/users', headers=headers)):
+            self.assertNotIn('Access-Control-Allow-Origin', response.headers)
+            self.assertNotIn('Access-Control-Max-Age', response.headers)
+            self.assertEqual('Origin', response.headers['Vary'])
+
+
+class CorsOriginsTest(unittest.TestCase):
+    def test_origins_are_stripped(self):
+        self.assertEqual(
+            ['https://a.example.com', 'https://b.example.com'],
+            cors_origins(' https://a.example.com, https://b.example.com,'))
+        self.assertEqual(['*'], cors_origins('*'))
@@ -0,0 +1,58 @@
+import unittest
+
+from api.counts import LocalCount
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LocalCountTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.count = LocalCount(max_age=60, clock=self.clock)
+        self.counted = 0
+
+    def _count_rows(self):
+        self.counted += 1
+        return 10
+
+    def test_counts_once_then_serves_the_kept_count(self):
+        self.assertEqual(10, self.count.get(self._count_rows))
+        self.assertEqual(10, self.count.get(self._count_rows))
+        self.assertEqual(1, self.counted)
+
+    def test_writes_adjust_the_count(self):
+        self.count.get(self._count_rows)
+        self.count.add(3)
+        self.count.add(-1)
+        self.assertEqual(12, self.count.get(self._count_rows))
+        self.assertEqual(1, self.counted)
+
+    def test_writes_before_the_first_count_are_ignored(self):
+        self.count.add(5)
+        self.assertEqual(10, self.count.get(self._count_rows))
+
+    def test_never_goes_negative(self):
+        self.count.get(self._count_rows)
+        self.count.add(-50)
+        self.assertEqual(0, self.count.get(self._count_rows))
+
+    def test_reconciles_once_it_is_old(self):
+        self.count.get(self._count_rows)
+        self.count.add(7)
+        self.clock.now = 59
+        self.assertEqual(17, self.count.get(self._count_rows))
+        self.clock.now = 60
+        self.assertEqual(10, self.count.get(self._count_rows))
+        self.assertEqual(2, self.counted)
+
+    def test_clear(self):
+        self.count.get(self._count_rows)
+        self.count.clear()
+        self.count.get(self._count_rows)
+        self.assertEqual(2, self.counted)
@@ -1,23 +1,9 @@
 import json
-import unittest
 
-from api import create_app, db
-from tests import db_drop_everything, assert_payload_field_type_value
+from tests import DatabaseTestCase, assert_payload_field_type_value
 
 
-class ErrorsTest(unittest.TestCase):
-    def setUp(self):
-        self.app = create_app('testing')
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-        self.client = self.app.test_client()
-
-    def tearDown(self):
-        db.session.remove()
-        db_drop_everything(db)
-        self.app_context.pop()
-
+class ErrorsTest(DatabaseTestCase):
     def test_404_error(self):
         response = self.client.get('/lkjasdkj')
 
@@ -0,0 +1,106 @@
+import gc
+import importlib
+import os
+import sys
+import unittest
+from unittest import mock
+
+import gunicorn_config
+
+
+def _load(**environ):
+    """
+    gunicorn_config.py loaded with just these environment variables, and
+    config.py imported after it, as it is when gunicorn starts
+    """
+    with mock.patch.dict(os.environ, environ, clear=True), \
+            mock.patch.dict(sys.modules):
+        sys.modules.pop('config')
+        settings = importlib.reload(gunicorn_config)
+        return settings, importlib.import_module('config')
+
+
+class GunicornConfigTest(unittest.TestCase):
+    def tearDown(self):
+        importlib.reload(gunicorn_config)
+        # preloading turns the collector off until the master is ready
+        gc.enable()
+
+    def test_sync_outside_production(self):
+        settings, _ = _load(FLASK_CONFIG='development')
+        self.assertEqual('sync', settings.worker_class)
+        self.assertEqual(1, settings.threads)
+
+    def test_production_picks_a_concurrent_worker(self):
+        settings, _ = _load(FLASK_CONFIG='production')
+        self.assertIn(settings.worker_class, ('gevent', 'gthread'))
+
+    def test_gthread_pool_has_a_connection_per_thread(self):
+        settings, config = _load(
+            GUNICORN_PROFILE='gthread', GUNICORN_THREADS='16',
+            FLASK_CONFIG='production',
+            DATABASE_URL='postgresql://localhost/db')
+        self.assertEqual('gthread', settings.worker_class)
+        self.assertEqual(16, settings.threads)
+        self.assertEqual(16, config.config['production']
+                         .SQLALCHEMY_ENGINE_OPTIONS['pool_size'])
+
+    def test_gthread_keeps_a_bigger_pool(self):
+        # production's pool of 10 is already enough for 4 threads
+        _, config = _load(GUNICORN_PROFILE='gthread',
+                          FLASK_CONFIG='production',
+                          DATABASE_URL='postgresql://localhost/db')
+        self.assertEqual(10, config.config['production']
+                         .SQLALCHEMY_ENGINE_OPTIONS['pool_size'])
+
+    def test_gevent_takes_on_what_the_pool_can_serve(self):
+        settings, _ = _load(
+            GUNICORN_PROFILE='gevent', FLASK_CONFIG='production',
+            DATABASE_URL='postgresql://localhost/db', DB_POOL_SIZE='6',
+            DB_POOL_MAX_OVERFLOW='4')
+        self.assertEqual(10, settings.worker_connections)
+
+        settings, _ = _load(
+            GUNICORN_PROFILE='gevent', FLASK_CONFIG='production',
+            DATABASE_URL='postgresql://localhost/db')
+        self.assertEqual(20, settings.worker_connections)
+
+        settings, _ = _load(
+            GUNICORN_PROFILE='gevent', FLASK_CONFIG='production',
+            DATABASE_URL='postgresql://localhost/db',
+            GUNICORN_WORKER_CONNECTIONS='50')
+        self.assertEqual(50, settings.worker_connections)
+
+    def test_explicit_pool_size_wins(self):
+        _, config = _load(GUNICORN_PROFILE='gthread',
+                          FLASK_CONFIG='production',
+                          DATABASE_URL='postgresql://localhost/db',
+                          DB_POOL_SIZE='3')
+        self.assertEqual(3, config.config['production']
+                         .SQLALCHEMY_ENGINE_OPTIONS['pool_size'])
+
+    def test_workers_from_web_concurrency(self):
+        settings, _ = _load(WEB_CONCURRENCY='5')
+        self.assertEqual(5, settings.workers)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            _load(GUNICORN_PROFILE='uvicorn')
+
+    def test_preload_by_profile(self):
+        self.assertTrue(_load(GUNICORN_PROFILE='sync')[0].preload_app)
+        self.assertTrue(_load(GUNICORN_PROFILE='gthread')[0].preload_app)
+        # gevent has to patch the standard library before the app loads
+        self.assertFalse(_load(GUNICORN_PROFILE='gevent')[0].preload_app)
+        self.assertFalse(_load(GUNICORN_PROFILE='sync',
+                               GUNICORN_PRELOAD='false')[0].preload_app)
+
+    def test_objects_are_frozen_before_forking(self):
+        settings, _ = _load(GUNICORN_PROFILE='sync')
+        self.assertFalse(gc.isenabled())
+        try:
+            settings.when_ready(None)
+            self.assertTrue(gc.isenabled())
+            self.assertGreater(gc.get_freeze_count(), 0)
+        finally:
+            gc.unfreeze()
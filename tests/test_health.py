@@ -0,0 +1,99 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+from api import create_app, db, prepare_worker
+from api.database.pool import pool_status, reset_pool, warm_up_pool
+from config import engine_options
+from tests import assert_payload_field_type_value, assert_payload_field_type
+
+
+class HealthTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        self.app_context.pop()
+
+    def test_healthz(self):
+        response = self.client.get('/healthz')
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, True)
+        assert_payload_field_type_value(self, data, 'database', str, 'ok')
+        assert_payload_field_type(self, data, 'pool', dict)
+        assert_payload_field_type(self, data['pool'], 'class', str)
+
+    def test_healthz_database_down(self):
+        error = OperationalError('SELECT 1', {}, Exception('gone'))
+        with patch('api.resources.health.db.session.execute',
+                   side_effect=error):
+            response = self.client.get('/healthz')
+        self.assertEqual(503, response.status_code)
+
+        data = json.loads(response.data.decode('utf-8'))
+        assert_payload_field_type_value(self, data, 'success', bool, False)
+        assert_payload_field_type_value(
+            self, data, 'database', str, 'unavailable'
+        )
+
+
+class PoolTest(unittest.TestCase):
+    def test_warm_up_and_status(self):
+        engine = create_engine('sqlite://', poolclass=QueuePool,
+                               pool_size=3, max_overflow=0)
+        self.assertEqual(3, warm_up_pool(engine, 5))
+
+        status = pool_status(engine)
+        self.assertEqual('QueuePool', status['class'])
+        self.assertEqual(3, status['size'])
+        self.assertEqual(3, status['checkedin'])
+        self.assertEqual(0, status['checkedout'])
+
+    def test_reset_pool(self):
+        engine = create_engine('sqlite://', poolclass=QueuePool,
+                               pool_size=3, max_overflow=0)
+        warm_up_pool(engine, 3)
+        inherited = engine.pool
+
+        self.assertEqual(2, reset_pool(engine, 2))
+        self.assertIsNot(inherited, engine.pool)
+        self.assertEqual(2, pool_status(engine)['checkedin'])
+        self.assertEqual(0, reset_pool(engine))
+
+    def test_create_app_does_not_connect(self):
+        app = create_app('testing')
+        # Flask-SQLAlchemy creates each app's engine the first time it's used
+        self.assertEqual({}, app.extensions['sqlalchemy'].connectors)
+
+        app.config['SQLALCHEMY_POOL_WARMUP'] = 1
+        self.assertEqual(1, prepare_worker(app))
+
+    def test_engine_options(self):
+        options = engine_options(
+            'postgresql://localhost/api', pool_size=10, max_overflow=5,
+            pool_timeout=10, pool_recycle=1800, pool_pre_ping=True)
+        self.assertEqual({
+            'pool_size': 10,
+            'max_overflow': 5,
+            'pool_timeout': 10,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+        }, options)
+
+        with patch.dict('os.environ', {'DB_POOL_SIZE': '3'}):
+            options = engine_options(
+                'sqlite:///api.db', pool_size=10, max_overflow=5,
+                pool_timeout=10, pool_recycle=1800, pool_pre_ping=False)
+        self.assertEqual(
+            {'pool_recycle': 1800, 'pool_pre_ping': False}, options
+        )
@@ -0,0 +1,152 @@
+import os
+import tempfile
+from unittest import mock
+
+from flask import g
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+
+from api import db
+from api.database.models import User
+from api.database.pool import TimedQueuePool
+from api.metrics import Metrics, latest
+from api.resources.health import HealthResource
+from tests import DatabaseTestCase
+
+
+def _sample(name, endpoint):
+    return REGISTRY.get_sample_value(name, {'endpoint': endpoint}) or 0
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        User(username='zzz 1', email='e1').insert()
+
+    def test_queries_are_counted_per_endpoint(self):
+        queries = _sample('api_db_queries_total', 'usersresource')
+        observed = _sample('api_db_query_duration_seconds_count',
+                           'usersresource')
+
+        response = self.client.get('/api/v1/users')
+        self.assertEqual(200, response.status_code)
+
+        # one to count the users for X-Total-Count, one for the page itself
+        self.assertEqual(
+            queries + 2, _sample('api_db_queries_total', 'usersresource')
+        )
+        self.assertEqual(
+            observed + 2,
+            _sample('api_db_query_duration_seconds_count', 'usersresource')
+        )
+
+    def test_failed_queries_leave_nothing_behind(self):
+        with self.app.test_request_context('/healthz'):
+            g.sample_queries = True
+            with self.assertRaises(DBAPIError):
+                with db.session.begin_nested():
+                    db.session.execute('SELECT * FROM no_such_table')
+            self.assertNotIn('query_start', db.session.connection().info)
+
+            queries = _sample('api_db_queries_total', 'healthresource')
+            db.session.execute('SELECT 1')
+            self.assertEqual(
+                queries + 1, _sample('api_db_queries_total', 'healthresource')
+            )
+
+    def test_unsampled_requests_are_not_measured(self):
+        self.app.config['QUERY_SAMPLE_RATE'] = 0
+        queries = _sample('api_db_queries_total', 'usersresource')
+
+        self.client.get('/api/v1/users')
+        self.assertEqual(
+            queries, _sample('api_db_queries_total', 'usersresource')
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/v1/users')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn(
+            'api_db_queries_total{endpoint="usersresource"}',
+            response.data.decode('utf-8')
+        )
+
+    def test_requests_are_counted_by_resource_method_and_status(self):
+        labels = {'resource': 'UsersResource', 'method': 'GET'}
+        ok = _value('api_requests_total', status='200', **labels)
+        timed = _value('api_request_duration_seconds_count', **labels)
+        sized = _value('api_response_size_bytes_count', **labels)
+
+        response = self.client.get('/api/v1/users')
+        self.assertEqual(200, response.status_code)
+
+        self.assertEqual(
+            ok + 1, _value('api_requests_total', status='200', **labels))
+        self.assertEqual(
+            timed + 1, _value('api_request_duration_seconds_count', **labels))
+        self.assertEqual(
+            sized + 1, _value('api_response_size_bytes_count', **labels))
+
+    def test_error_responses_are_counted(self):
+        missing = _value('api_requests_total', resource='UserResource',
+                         method='GET', status='404')
+        failed = _value('api_requests_total', resource='HealthResource',
+                        method='GET', status='500')
+
+        response = self.client.get('/api/v1/users/9999')
+        self.assertEqual(404, response.status_code)
+        with mock.patch.object(HealthResource, 'get',
+                               side_effect=RuntimeError('boom')):
+            self.assertEqual(500, self.client.get('/healthz').status_code)
+
+        self.assertEqual(missing + 1, _value(
+            'api_requests_total', resource='UserResource', method='GET',
+            status='404'))
+        self.assertEqual(failed + 1, _value(
+            'api_requests_total', resource='HealthResource', method='GET',
+            status='500'))
+
+    def test_in_flight_requests_go_back_down(self):
+        in_flight = _value('api_requests_in_flight')
+
+        self.client.get('/api/v1/users')
+        self.client.get('/api/v1/users/9999')
+        self.assertEqual(in_flight, _value('api_requests_in_flight'))
+
+    def test_pool_checkouts_are_timed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(
+                f'sqlite:///{os.path.join(directory, "pool.db")}',
+                poolclass=TimedQueuePool, pool_size=1)
+            checkouts = _value('api_db_pool_checkout_seconds_count')
+            engine.connect().close()
+            engine.dispose()
+        self.assertEqual(
+            checkouts + 1, _value('api_db_pool_checkout_seconds_count'))
+
+    def test_queue_pools_get_checkout_timing(self):
+        options = {'pool_size': 10, 'pool_recycle': 1800}
+        with mock.patch.dict(self.app.config,
+                             {'SQLALCHEMY_ENGINE_OPTIONS': options}):
+            Metrics._time_pool_checkouts(self.app.config)
+            self.assertIs(
+                TimedQueuePool,
+                self.app.config['SQLALCHEMY_ENGINE_OPTIONS']['poolclass'])
+        # the config class's own options are left alone
+        self.assertNotIn('poolclass', options)
+
+    def test_multiprocess_mode_reads_the_metrics_directory(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ,
+                                {'prometheus_multiproc_dir': directory}):
+            # nothing has been written there by any worker yet
+            self.assertEqual(b'', latest())
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+import bleach
+
+from api.sanitizer import clean, sanitize
+
+
+class SanitizerTest(unittest.TestCase):
+    def test_clean_matches_bleach(self):
+        values = [
+            'ian', 'ian.douglas@iandouglas.com', 'a"b', "a'b", 'tab\there',
+            'new\nline', 'a\rb', 'a\x00b', 'a\x0cb', 'a&b', 'a&amp;b',
+            '<script>alert(1)</script>', '<b>bold</b>', 'a < b > c',
+            'café', '\U0001f600', '',
+        ]
+        for value in values:
+            self.assertEqual(bleach.clean(value), clean(value), repr(value))
+
+    def test_plain_text_skips_bleach(self):
+        with patch('bleach.clean') as bleach_clean:
+            self.assertEqual('plain text', clean('plain text'))
+            bleach_clean.assert_not_called()
+
+    def test_repeated_values_are_memoized(self):
+        clean('<u>memoized</u>')
+        with patch('bleach.clean') as bleach_clean:
+            self.assertEqual('&lt;u&gt;memoized&lt;/u&gt;',
+                             clean('<u>memoized</u>'))
+            bleach_clean.assert_not_called()
+
+    def test_sanitize_trims_before_and_after_cleaning(self):
+        self.assertEqual('ian', sanitize(' ian '))
+        self.assertEqual('ian', sanitize('\x00 ian'))
+        self.assertEqual('', sanitize(' \x00 '))
+
+    def test_bleach_is_not_imported_with_the_app(self):
+        imported = subprocess.check_output([
+            sys.executable, '-c',
+            "import sys, run; print('bleach' in sys.modules)"
+        ])
+        self.assertEqual(b'False', imported.strip())
@@ -0,0 +1,43 @@
+import unittest
+
+from api.schemas import Field, Schema, user_schema
+
+
+class SchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema(Field('name', max_length=5), Field('nickname'))
+
+    def test_valid_payload(self):
+        values, errors = self.schema.validate(
+            {'name': ' ian ', 'nickname': '<u>', 'extra': 1}
+        )
+        self.assertEqual([], errors)
+        self.assertEqual({'name': 'ian', 'nickname': '&lt;u&gt;'}, values)
+
+    def test_every_error_is_reported(self):
+        values, errors = self.schema.validate({'name': 'too long'})
+        self.assertEqual({}, values)
+        self.assertEqual([
+            "'name' parameter must be 5 characters or fewer",
+            "required 'nickname' parameter is missing",
+        ], errors)
+
+    def test_partial_payload(self):
+        values, errors = self.schema.validate({'nickname': 7}, partial=True)
+        self.assertEqual({}, values)
+        self.assertEqual(["'nickname' parameter must be a string"], errors)
+
+        values, errors = self.schema.validate({}, partial=True)
+        self.assertEqual(({}, []), (values, errors))
+
+    def test_payload_must_be_an_object(self):
+        self.assertEqual(
+            ({}, ['request body must be a JSON object']),
+            self.schema.validate(['name'])
+        )
+
+    def test_user_schema_uses_model_column_lengths(self):
+        self.assertEqual(
+            {'username': 80, 'email': 100},
+            {field.name: field.max_length for field in user_schema.fields}
+        )
@@ -0,0 +1,59 @@
+import unittest
+from types import SimpleNamespace
+
+from api import create_app
+from api.serializers import UserSerializer
+
+
+class UserSerializerTest(unittest.TestCase):
+    def setUp(self):
+        self.serializer = UserSerializer(
+            '/api/v1/users/<int:user_id>', '/api/v1/users'
+        )
+        self.user = SimpleNamespace(id=7, username='ian', email='ian@x')
+
+    def test_templates_come_from_the_app_routes(self):
+        app = create_app('testing')
+        serializer = app.extensions['user_serializer']
+        self.assertEqual('/api/v1/users/', serializer.item_prefix)
+        self.assertEqual('', serializer.item_suffix)
+        self.assertEqual('/api/v1/users', serializer.index_url)
+
+    def test_serialize(self):
+        self.assertEqual({
+            'id': 7,
+            'username': 'ian',
+            'email': 'ian@x',
+            'links': {
+                'get': '/api/v1/users/7',
+                'patch': '/api/v1/users/7',
+                'delete': '/api/v1/users/7',
+                'index': '/api/v1/users',
+            }
+        }, self.serializer.serialize(self.user))
+
+    def test_serialize_sparse_fieldset(self):
+        self.assertEqual(
+            {'id': 7, 'username': 'ian'},
+            self.serializer.serialize(self.user, fields=('id', 'username'))
+        )
+        self.assertEqual(
+            {'id': 7, 'username': 'ian', 'email': 'ian@x'},
+            self.serializer.serialize(self.user, links=False)
+        )
+
+    def test_select_from_a_built_payload(self):
+        payload = self.serializer.serialize(self.user)
+        self.assertEqual(payload, self.serializer.select(payload))
+        self.assertIsNot(payload, self.serializer.select(payload))
+        self.assertEqual(
+            {'email': 'ian@x'},
+            self.serializer.select(payload, fields=('email', 'links'),
+                                   links=False)
+        )
+
+    def test_rule_suffix(self):
+        serializer = UserSerializer('/users/<user_id>/profile', '/users')
+        self.assertEqual(
+            '/users/7/profile', serializer.links(7)['get']
+        )
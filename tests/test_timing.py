@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+from prometheus_client import REGISTRY
+
+from tests import DatabaseTestCase
+
+
+def _phases(response):
+    return [
+        timing.split(';')[0]
+        for timing in response.headers['Server-Timing'].split(', ')
+    ]
+
+
+class TimingTest(DatabaseTestCase):
+    def test_server_timing_header(self):
+        response = self.client.get('/api/v1/users')
+        self.assertEqual(
+            ['routing', 'db', 'serialization', 'total'], _phases(response)
+        )
+
+        response = self.client.post(
+            '/api/v1/users', json={'username': 'ian', 'email': 'ian@x'},
+            content_type='application/json'
+        )
+        self.assertEqual(
+            ['routing', 'validation', 'db', 'serialization', 'total'],
+            _phases(response)
+        )
+
+    def test_timings_are_kept_per_resource_and_method(self):
+        labels = {'resource': 'UsersResource', 'method': 'GET',
+                  'phase': 'total'}
+        before = REGISTRY.get_sample_value(
+            'api_request_phase_seconds_count', labels) or 0
+
+        self.client.get('/api/v1/users')
+        self.assertEqual(before + 1, REGISTRY.get_sample_value(
+            'api_request_phase_seconds_count', labels))
+
+    def test_profiling_on_request(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.app.config['PROFILE_DIR'] = directory
+
+            # profiling is off in the testing config
+            response = self.client.get(
+                '/api/v1/users', headers={'X-Profile': '1'}
+            )
+            self.assertNotIn('X-Profile-File', response.headers)
+
+            self.app.config['PROFILING_ENABLED'] = True
+            response = self.client.get('/api/v1/users')
+            self.assertNotIn('X-Profile-File', response.headers)
+
+            response = self.client.get(
+                '/api/v1/users', headers={'X-Profile': '1'}
+            )
+            path = response.headers['X-Profile-File']
+            self.assertTrue(path.startswith(directory))
+            self.assertTrue(path.endswith('.prof'))
+            self.assertTrue(os.path.exists(path))